@@ -3,11 +3,24 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import event
 
-import os
+import os, time
+from .services.prom import db_session, db_commit
+from .services import sql_profile
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./esl.db")
 
+class TimedSession(AsyncSession):
+    """commit süresini /metrics için ölçen AsyncSession."""
+
+    async def commit(self) -> None:
+        start = time.perf_counter()
+        try:
+            await super().commit()
+        finally:
+            db_commit.observe(time.perf_counter() - start)
+
 engine = create_async_engine(DATABASE_URL, echo=False, future=True)
-SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+sql_profile.install(engine)
+SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=TimedSession)
 
 class Base(DeclarativeBase):
     pass
@@ -24,10 +37,62 @@ async def init_db() -> None:
                 await conn.exec_driver_sql("ALTER TABLE user ADD COLUMN employee_no TEXT")
         except Exception:
             pass
+        await _ensure_column(conn, "price_change_request", "campaign_id", "TEXT REFERENCES campaign(id)")
+        if await _ensure_column(conn, "product", "updated_at", "DATETIME"):
+            await conn.exec_driver_sql("UPDATE product SET updated_at = created_at")
+        progress_cols = [await _ensure_column(conn, "price_change_request", col, "INTEGER NOT NULL DEFAULT 0")
+                         for col in ("jobs_total", "jobs_success", "jobs_failed", "jobs_cancelled")]
+        if any(progress_cols):
+            await conn.exec_driver_sql("""
+                UPDATE price_change_request SET
+                  jobs_total = (SELECT count(*) FROM push_job j WHERE j.request_id = price_change_request.id),
+                  jobs_success = (SELECT count(*) FROM push_job j WHERE j.request_id = price_change_request.id AND j.status = 'SUCCESS'),
+                  jobs_failed = (SELECT count(*) FROM push_job j WHERE j.request_id = price_change_request.id AND j.status = 'FAILED'),
+                  jobs_cancelled = (SELECT count(*) FROM push_job j WHERE j.request_id = price_change_request.id AND j.status = 'CANCELLED')
+            """)
+        await _ensure_column(conn, "push_job", "lease_owner", "TEXT")
+        if await _ensure_column(conn, "push_job", "lease_expires_at", "DATETIME"):
+            # eski PROCESSING işlerinde kira bitişi olarak zaman aşımı kullanılıyordu
+            await conn.exec_driver_sql(
+                "UPDATE push_job SET lease_expires_at = next_run_at WHERE status = 'PROCESSING'")
+        # satır sürümleri (/live/changes): sütun yeni eklendiyse mevcut satırlara sürüm ver
+        from .services import change_log
+        added = [t for t in change_log.VERSIONED_TABLES
+                 if await _ensure_column(conn, t, "row_version", "INTEGER NOT NULL DEFAULT 0")]
+        await change_log.install(conn)
+        for table in added:
+            await change_log.backfill(conn, table)
+        await change_log.prune(conn)
+        # create_all mevcut tablolara sonradan eklenen indeksleri kurmaz
+        await conn.run_sync(lambda c: [
+            ix.create(c, checkfirst=True)
+            for t in models.Base.metadata.sorted_tables for ix in t.indexes
+        ])
+        # günlük fiyat özeti yeni eklendiyse mevcut geçmişten doldur
+        rollups = (await conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM price_daily_rollup)")).scalar()
+        history = (await conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM price_history)")).scalar()
+        if history and not rollups:
+            from .services import price_rollup
+            await price_rollup.rebuild(conn)
+
+async def _ensure_column(conn, table: str, column: str, ddl: str) -> bool:
+    """SQLite tablosunda sütun yoksa ekler; eklendiyse True döner."""
+    try:
+        cols = await conn.exec_driver_sql(f"PRAGMA table_info('{table}')")
+        if column in {row[1] for row in cols}:
+            return False
+        await conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        return True
+    except Exception:
+        return False
 
 async def get_session() -> AsyncSession:
-    async with SessionLocal() as session:
-        yield session
+    start = time.perf_counter()
+    try:
+        async with SessionLocal() as session:
+            yield session
+    finally:
+        db_session.observe(time.perf_counter() - start)
 
 # (İsteğe bağlı) SQLite PRAGMA'ları
 @event.listens_for(engine.sync_engine, "connect")
@@ -1,13 +1,21 @@
 from __future__ import annotations
-from fastapi import FastAPI
+import os, time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from starlette.staticfiles import StaticFiles
 
 from .database import init_db, SessionLocal
-from .routers import products, labels, price_changes, push, live, auth
+from .routers import products, labels, price_changes, push, live, auth, campaigns, imports, metrics, simulate
 from .services.emulator import EmulatorService
-from .services.push_runner import PushRunner
+from .services.push_runner import PushRunner, job_signal
+from .services.label_health import label_health
+from .services.scheduler import price_scheduler
+from .services.prom import http_requests, http_latency
+from .services.sql_profile import profile
+from .services.event_bus import event_bus
+from .services.wall_cache import wall_cache
+from .services.fanout import fanout_index
 
 # ---- BURASI KRİTİK: modül seviyesinde, girintisiz olmalı ----
 app = FastAPI(title="ESL Python Sim — FastAPI")
@@ -18,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-SQL-Queries", "X-SQL-Time-Ms"],
 )
 
 # API router'ları
@@ -27,18 +36,63 @@ app.include_router(price_changes.router)
 app.include_router(push.router)
 app.include_router(live.router)
 app.include_router(auth.router)
+app.include_router(campaigns.router)
+app.include_router(imports.router)
+app.include_router(metrics.router)
+app.include_router(simulate.router)
+
+@app.middleware("http")
+async def _http_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    with profile(f"{request.method} {request.url.path}") as sql:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if sql is not None:
+                response.headers["X-SQL-Queries"] = str(sql.count)
+                response.headers["X-SQL-Time-Ms"] = f"{sql.total_ms:.1f}"
+            return response
+        finally:
+            # ham path yerine route şablonu: etiket kardinalitesi sınırlı kalsın
+            route = getattr(request.scope.get("route"), "path", None)
+            if sql is not None and route:
+                # yavaş istek logları da uç nokta başına gruplansın
+                sql.name = f"{request.method} {route}"
+            route = route or "unmatched"
+            http_latency.observe(time.perf_counter() - start, request.method, route)
+            http_requests.inc(request.method, route, str(status))
 
 # statik dosyalar
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# arka plan servisleri
+# arka plan servisleri; PUSH_RUNNER=0 ise işler ayrı worker süreçlerinde
+# (python -m app.worker) yürür, bu süreç yalnızca API ve metrik yayını yapar
+PUSH_RUNNER = os.getenv("PUSH_RUNNER", "1").lower() not in ("0", "false", "no")
 emulator = EmulatorService(success_rate=0.98)
 push_runner = PushRunner(SessionLocal, emulator)
+app.state.emulator = emulator
 
 @app.on_event("startup")
 async def _startup():
     await init_db()
-    await push_runner.start()
+    # diğer süreçlerin yayınları bu sürecin istemcilerine ve önbelleğine de ulaşsın
+    live.manager.remote_hooks.append(wall_cache.on_remote_event)
+    live.manager.remote_hooks.append(job_signal.on_remote_event)
+    live.manager.remote_hooks.append(fanout_index.on_remote_event)
+    live.manager.remote_hooks.append(price_scheduler.on_remote_event)
+    await event_bus.start(live.manager.deliver_remote)
+    await label_health.start(SessionLocal)
+    await fanout_index.start(SessionLocal)
+    await push_runner.start(process_jobs=PUSH_RUNNER)
+    if PUSH_RUNNER:
+        await price_scheduler.start(SessionLocal)
+
+@app.on_event("shutdown")
+async def _shutdown():
+    # bekleyen etiket telemetrisini kaybetme
+    await label_health.stop()
+    await event_bus.stop()
 
 @app.get("/")
 def _root():
@@ -1,7 +1,7 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
-from sqlalchemy import String, Integer, ForeignKey, Numeric, DateTime, UniqueConstraint, Index
+from sqlalchemy import String, Integer, ForeignKey, Numeric, DateTime, Date, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .database import Base
 from datetime import datetime
@@ -25,6 +25,9 @@ class Product(Base):
     base_price: Mapped[Decimal] = mapped_column(Numeric(12, 2))
     currency: Mapped[str] = mapped_column(String, default="TRY")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+    # değişiklik sürümü: INSERT/UPDATE'te tetikleyici change_seq'ten atar (bkz. /live/changes)
+    row_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     assignments: Mapped[list["LabelAssignment"]] = relationship(back_populates="product")
     price_requests: Mapped[list["PriceChangeRequest"]] = relationship(back_populates="product")
 
@@ -36,6 +39,7 @@ class ShelfLabel(Base):
     battery_pct: Mapped[int] = mapped_column(Integer, default=95)
     status: Mapped[str] = mapped_column(String, default="ONLINE")
     last_seen: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    row_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     assignments: Mapped[list["LabelAssignment"]] = relationship(back_populates="label")
 
 class LabelAssignment(Base):
@@ -43,13 +47,25 @@ class LabelAssignment(Base):
     label_id: Mapped[str] = mapped_column(ForeignKey("shelf_label.id"), primary_key=True)
     product_id: Mapped[str] = mapped_column(ForeignKey("product.id"), primary_key=True)
     assigned_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    row_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     label: Mapped["ShelfLabel"] = relationship(back_populates="assignments")
     product: Mapped["Product"] = relationship(back_populates="assignments")
     __table_args__ = (UniqueConstraint("label_id", "product_id", name="uq_label_product"),)
 
+class Campaign(Base):
+    __tablename__ = "campaign"
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    name: Mapped[str] = mapped_column(String)
+    percent: Mapped[Decimal | None] = mapped_column(Numeric(6, 2), nullable=True)  # örn. -10 => %10 indirim
+    new_price: Mapped[Decimal | None] = mapped_column(Numeric(12, 2), nullable=True)
+    status: Mapped[str] = mapped_column(String, default="PENDING")  # PENDING, APPROVED, REJECTED, STARTED
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    requests: Mapped[list["PriceChangeRequest"]] = relationship(back_populates="campaign")
+
 class PriceChangeRequest(Base):
     __tablename__ = "price_change_request"
     id: Mapped[str] = mapped_column(String, primary_key=True)
+    campaign_id: Mapped[str | None] = mapped_column(ForeignKey("campaign.id"), nullable=True, index=True)
     product_id: Mapped[str] = mapped_column(ForeignKey("product.id"))
     store: Mapped[str] = mapped_column(String, index=True)
     old_price: Mapped[Decimal | None] = mapped_column(Numeric(12, 2), nullable=True)
@@ -58,7 +74,14 @@ class PriceChangeRequest(Base):
     reason: Mapped[str | None] = mapped_column(String, nullable=True)
     scheduled_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # push ilerleme sayaçları; işler durum değiştirdikçe aynı transaction'da güncellenir
+    jobs_total: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    jobs_success: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    jobs_failed: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    jobs_cancelled: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    row_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     product: Mapped["Product"] = relationship(back_populates="price_requests")
+    campaign: Mapped["Campaign | None"] = relationship(back_populates="requests")
     approvals: Mapped[list["Approval"]] = relationship(back_populates="request")
     push_jobs: Mapped[list["PushJob"]] = relationship(back_populates="request")
 
@@ -82,6 +105,10 @@ class PushJob(Base):
     last_error: Mapped[str | None] = mapped_column(String, nullable=True)
     next_run_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # PROCESSING işin sahibi (worker id) ve kiranın bitişi; süresi dolan iş geri alınabilir
+    lease_owner: Mapped[str | None] = mapped_column(String, nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    row_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     request: Mapped["PriceChangeRequest"] = relationship(back_populates="push_jobs")
 
 class PriceHistory(Base):
@@ -96,4 +123,48 @@ class PriceHistory(Base):
     changed_by = Column(String, nullable=True)  # örn: "system/push" veya onaylayan kullanıcı
     changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
+class PriceDailyRollup(Base):
+    """(ürün, mağaza, gün) başına fiyat özeti; PriceHistory yazılırken artımlı güncellenir."""
+    __tablename__ = "price_daily_rollup"
+    product_id: Mapped[str] = mapped_column(ForeignKey("product.id"), primary_key=True)
+    store: Mapped[str] = mapped_column(String, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    open_price: Mapped[float] = mapped_column(Float)  # günün ilk değişikliğinden önceki fiyat
+    close_price: Mapped[float] = mapped_column(Float)  # günün son değişikliğindeki fiyat
+    min_price: Mapped[float] = mapped_column(Float)
+    max_price: Mapped[float] = mapped_column(Float)
+    changes: Mapped[int] = mapped_column(Integer, default=0)
+    first_at: Mapped[datetime] = mapped_column(DateTime)
+    last_at: Mapped[datetime] = mapped_column(DateTime)
+
+class ChangeSeq(Base):
+    """Tek satırlık global değişiklik sayacı; tetikleyiciler artırır."""
+    __tablename__ = "change_seq"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, default=0)
+    floor: Mapped[int] = mapped_column(Integer, default=0)  # bu sürüme kadarki silme kayıtları budandı
+
+class ChangeTombstone(Base):
+    """Silinen satırların anahtarları; /live/changes silmeleri buradan döner."""
+    __tablename__ = "change_tombstone"
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tbl: Mapped[str] = mapped_column(String)
+    row_key: Mapped[str] = mapped_column(String)  # birincil anahtar sütunlarının JSON'u
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
 Index("ix_push_job_next", PushJob.next_run_at)
+Index("ix_price_change_request_status_scheduled", PriceChangeRequest.status, PriceChangeRequest.scheduled_at)
+Index("ix_price_history_product_store_changed", PriceHistory.product_id, PriceHistory.store, PriceHistory.changed_at)
+Index("ix_push_job_request", PushJob.request_id)
+Index("ix_push_job_label", PushJob.label_id)
+Index("ix_push_job_status_id", PushJob.status, PushJob.id)
+Index("ix_push_job_updated", PushJob.updated_at)
+Index("ix_shelf_label_store_id", ShelfLabel.store, ShelfLabel.id)
+Index("ix_shelf_label_last_seen", ShelfLabel.last_seen)
+Index("ix_label_assignment_product", LabelAssignment.product_id)
+Index("ix_product_updated", Product.updated_at)
+Index("ix_product_row_version", Product.row_version)
+Index("ix_shelf_label_row_version", ShelfLabel.row_version)
+Index("ix_label_assignment_row_version", LabelAssignment.row_version)
+Index("ix_price_change_request_row_version", PriceChangeRequest.row_version)
+Index("ix_push_job_row_version", PushJob.row_version)
@@ -0,0 +1,51 @@
+import base64, json
+from datetime import datetime
+from typing import Any, Optional
+from fastapi import HTTPException, Query, Response
+
+# Keyset (cursor) sayfalama yardımcıları.
+# Liste uçları `limit` verilmezse eskisi gibi tüm listeyi döner; verilirse
+# `id > cursor ORDER BY id LIMIT n` ile indeks üzerinden tek sayfa okunur ve
+# sonraki sayfanın imleci `X-Next-Cursor` başlığında döner (gövde yine liste).
+
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(value: Any) -> str:
+    raw = json.dumps(value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Any:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(raw)
+    except Exception:
+        raise HTTPException(400, "invalid cursor")
+
+class PageParams:
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+        cursor: Optional[str] = Query(None),
+        updated_since: Optional[datetime] = Query(None),
+    ) -> None:
+        self.limit = limit
+        self.after = decode_cursor(cursor)
+        self.updated_since = updated_since
+
+    def paged(self, q, key_col):
+        """Sorguya keyset koşulunu ve sıralamayı ekler (limit+1 satır okunur)."""
+        if self.limit is None:
+            return q
+        if self.after is not None:
+            q = q.where(key_col > self.after)
+        return q.order_by(key_col).limit(self.limit + 1)
+
+    def trim(self, rows: list, response: Response, key) -> list:
+        """Fazladan okunan satırı atar ve varsa sonraki sayfa imlecini yazar."""
+        if self.limit is not None and len(rows) > self.limit:
+            rows = rows[:self.limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+        return rows
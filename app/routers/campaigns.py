@@ -0,0 +1,221 @@
+from __future__ import annotations
+from decimal import Decimal, ROUND_HALF_UP
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, func
+from sqlalchemy.exc import IntegrityError
+from ..database import get_session
+from .. import models
+from ..schemas import CampaignCreate, ApprovalIn
+from ..services.metrics import push_metrics
+from ..services.push_jobs import expand_requests, mark_no_labels, supersede_older, chunks
+from ..services.push_runner import job_signal
+from ..services.scheduler import price_scheduler
+
+router = APIRouter(prefix="/campaigns", tags=["campaigns"])
+
+_CENT = Decimal("0.01")
+
+def _apply_rule(body: CampaignCreate, base_price: Decimal) -> Decimal:
+    if body.new_price is not None:
+        return Decimal(body.new_price).quantize(_CENT, ROUND_HALF_UP)
+    price = Decimal(base_price) * (Decimal(100) + Decimal(body.percent)) / Decimal(100)
+    return price.quantize(_CENT, ROUND_HALF_UP)
+
+async def _approve(session: AsyncSession, campaign: models.Campaign, approver: str,
+                   decision: str = "APPROVE", comment: str | None = None) -> list:
+    """Kampanyanın bekleyen taleplerini karara bağlar; (id, scheduled_at) listesini döner.
+
+    Commit çağıranındır; zamanlayıcıya bildirim commit'ten sonra yapılmalı
+    (bkz. _track), yoksa zamanlayıcı henüz onaylı görünmeyen talepleri bulamaz.
+    """
+    pending = (await session.execute(
+        select(models.PriceChangeRequest.id, models.PriceChangeRequest.scheduled_at).where(
+            models.PriceChangeRequest.campaign_id == campaign.id,
+            models.PriceChangeRequest.status == "PENDING",
+        )
+    )).all()
+    req_ids = [rid for rid, _ in pending]
+    status = "APPROVED" if decision == "APPROVE" else "REJECTED"
+    await session.execute(
+        update(models.PriceChangeRequest)
+        .where(models.PriceChangeRequest.campaign_id == campaign.id,
+               models.PriceChangeRequest.status == "PENDING")
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+    approvals = [{
+        "id": f"appr-{rid}", "request_id": rid, "approver": approver,
+        "decision": decision, "comment": comment,
+    } for rid in req_ids]
+    for part in chunks(approvals):
+        await session.execute(insert(models.Approval), part)
+    campaign.status = status
+    return pending
+
+def _track(campaign: models.Campaign, pending: list) -> None:
+    # ileri tarihli talepler vakti gelince zamanlayıcı tarafından açılır
+    if campaign.status == "APPROVED":
+        price_scheduler.track(pending)
+
+async def _start(session: AsyncSession, campaign: models.Campaign) -> tuple[int, int, list[str]]:
+    """Onaylı talepleri işlere açar; (iş, iptal, etiketsiz talep id'leri) döner.
+
+    Mağazasında etiketi olmayan talepler NO_LABELS ile kapatılır; aksi halde
+    sonsuza dek APPROVED kalır ve kampanya hiç tamamlanmazdı.
+    """
+    # zamanlayıcının (ya da önceki bir start'ın) açtığı talepler atlanır
+    reqs = (await session.execute(
+        select(models.PriceChangeRequest).where(
+            models.PriceChangeRequest.campaign_id == campaign.id,
+            models.PriceChangeRequest.status == "APPROVED",
+            models.PriceChangeRequest.jobs_total == 0,
+        )
+    )).scalars().all()
+    counts = await expand_requests(session, reqs)
+    no_labels = sorted(rid for rid, n in counts.items() if not n)
+    await mark_no_labels(session, no_labels)
+    cancelled = await supersede_older(session, [r for r in reqs if counts.get(r.id)])
+    campaign.status = "STARTED"
+    return sum(counts.values()), cancelled, no_labels
+
+@router.post("/")
+async def create_campaign(body: CampaignCreate, session: AsyncSession = Depends(get_session)):
+    if (body.percent is None) == (body.new_price is None):
+        raise HTTPException(400, "percent veya new_price alanlarından tam olarak biri gerekli")
+    if not body.stores:
+        raise HTTPException(400, "stores boş olamaz")
+    if not body.product_ids and not body.skus:
+        raise HTTPException(400, "product_ids veya skus gerekli")
+    if body.start and not body.approver:
+        raise HTTPException(400, "start için approver gerekli")
+
+    products: dict[str, models.Product] = {}
+    for col, keys in ((models.Product.id, body.product_ids), (models.Product.sku, body.skus)):
+        for part in chunks(sorted(set(keys or []))):
+            for p in (await session.execute(select(models.Product).where(col.in_(part)))).scalars():
+                products[p.id] = p
+    if not products:
+        raise HTTPException(404, "Product not found")
+
+    campaign = models.Campaign(id=body.id, name=body.name, percent=body.percent,
+                               new_price=body.new_price, status="PENDING")
+    session.add(campaign)
+
+    rows = []
+    for prod in products.values():
+        new_price = _apply_rule(body, prod.base_price)
+        if new_price <= 0:
+            raise HTTPException(400, f"{prod.id} için hesaplanan fiyat geçersiz: {new_price}")
+        for store in sorted(set(body.stores)):
+            rows.append({
+                "id": f"{body.id}-{prod.id}-{store}",
+                "campaign_id": body.id,
+                "product_id": prod.id,
+                "store": store,
+                "old_price": prod.base_price,
+                "new_price": new_price,
+                "status": "PENDING",
+                "reason": body.reason or body.name,
+                "scheduled_at": body.scheduled_at,
+            })
+    try:
+        await session.flush()
+        for part in chunks(rows):
+            await session.execute(insert(models.PriceChangeRequest), part)
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(400, "Campaign id or request id already exists")
+
+    approved = jobs = cancelled = 0
+    no_labels: list[str] = []
+    if body.approver:
+        pending = await _approve(session, campaign, body.approver)
+        await session.commit()
+        _track(campaign, pending)
+        approved = len(pending)
+    if body.start:
+        try:
+            jobs, cancelled, no_labels = await _start(session, campaign)
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise HTTPException(409, "Campaign push already started")
+        push_metrics.added("QUEUED", jobs)
+        push_metrics.moved("QUEUED", "CANCELLED", cancelled)
+        job_signal.notify()
+
+    return {"ok": True, "id": campaign.id, "requests": len(rows), "approved": approved,
+            "jobs": jobs, "cancelled": cancelled, "no_labels": no_labels, "status": campaign.status}
+
+async def _get_campaign(session: AsyncSession, campaign_id: str) -> models.Campaign:
+    campaign = (await session.execute(
+        select(models.Campaign).where(models.Campaign.id == campaign_id)
+    )).scalar_one_or_none()
+    if not campaign:
+        raise HTTPException(404, "Campaign not found")
+    return campaign
+
+@router.post("/{campaign_id}/approve")
+async def approve_campaign(campaign_id: str, body: ApprovalIn, session: AsyncSession = Depends(get_session)):
+    campaign = await _get_campaign(session, campaign_id)
+    decision = body.decision.upper()
+    if decision not in ("APPROVE", "REJECT"):
+        raise HTTPException(400, "decision must be APPROVE or REJECT")
+    if campaign.status != "PENDING":
+        # onaylı / başlamış kampanyayı reddetmek talepleri çalışır halde bırakırdı
+        raise HTTPException(400, f"Campaign is {campaign.status}, not PENDING")
+    pending = await _approve(session, campaign, body.approver, decision, body.comment)
+    await session.commit()
+    _track(campaign, pending)
+    return {"ok": True, "status": campaign.status, "requests": len(pending)}
+
+@router.post("/{campaign_id}/start")
+async def start_campaign(campaign_id: str, session: AsyncSession = Depends(get_session)):
+    campaign = await _get_campaign(session, campaign_id)
+    if campaign.status != "APPROVED":
+        raise HTTPException(400, "Campaign not approved")
+    try:
+        # INSERT'ler commit'ten önce çalışır; eşzamanlı başlatma burada çakışır
+        jobs, cancelled, no_labels = await _start(session, campaign)
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(409, "Campaign push already started")
+    push_metrics.added("QUEUED", jobs)
+    push_metrics.moved("QUEUED", "CANCELLED", cancelled)
+    job_signal.notify()
+    return {"ok": True, "jobs": jobs, "cancelled": cancelled, "no_labels": no_labels}
+
+@router.get("/{campaign_id}")
+async def campaign_progress(campaign_id: str, session: AsyncSession = Depends(get_session)):
+    campaign = await _get_campaign(session, campaign_id)
+    req_rows = (await session.execute(
+        select(models.PriceChangeRequest.status, func.count())
+        .where(models.PriceChangeRequest.campaign_id == campaign_id)
+        .group_by(models.PriceChangeRequest.status)
+    )).all()
+    job_rows = (await session.execute(
+        select(models.PushJob.status, func.count())
+        .join(models.PriceChangeRequest, models.PriceChangeRequest.id == models.PushJob.request_id)
+        .where(models.PriceChangeRequest.campaign_id == campaign_id)
+        .group_by(models.PushJob.status)
+    )).all()
+    requests = {status: n for status, n in req_rows}
+    jobs = {status: n for status, n in job_rows}
+    total_jobs = sum(jobs.values())
+    done = jobs.get("SUCCESS", 0) + jobs.get("FAILED", 0) + jobs.get("CANCELLED", 0)
+    if total_jobs:
+        progress = round(done / total_jobs, 4)
+    else:
+        # hiç iş açılmadıysa (ör. tüm talepler NO_LABELS) başlatılmış kampanya bitmiştir
+        progress = 1.0 if campaign.status == "STARTED" and not requests.get("APPROVED") else 0.0
+    return {
+        "id": campaign.id,
+        "name": campaign.name,
+        "status": campaign.status,
+        "requests": {"total": sum(requests.values()), **requests},
+        "jobs": {"total": total_jobs, **jobs},
+        "progress": progress,
+    }
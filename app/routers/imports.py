@@ -0,0 +1,160 @@
+from __future__ import annotations
+from decimal import Decimal, InvalidOperation
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert
+from ..database import get_session
+from .. import models
+from ..services.importer import iter_records, detect_format
+from ..services.wall_cache import wall_cache
+from ..services.fanout import fanout_index
+from .live import manager
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+BATCH = 2000
+MAX_ERRORS = 100
+
+
+class _Keys:
+    """İçe aktarma boyunca benzersizlik kontrolü için bellekteki anahtar kümeleri."""
+
+    def __init__(self) -> None:
+        self.product_ids: set[str] = set()
+        self.skus: set[str] = set()
+        self.label_ids: set[str] = set()
+        self.label_codes: set[str] = set()
+        self.assignments: set[tuple[str, str]] = set()
+
+    async def load(self, session: AsyncSession, kind: str) -> None:
+        if kind in ("products", "assignments"):
+            for pid, sku in await session.execute(select(models.Product.id, models.Product.sku)):
+                self.product_ids.add(pid)
+                self.skus.add(sku)
+        if kind in ("labels", "assignments"):
+            for lid, code in await session.execute(select(models.ShelfLabel.id, models.ShelfLabel.label_code)):
+                self.label_ids.add(lid)
+                self.label_codes.add(code)
+        if kind == "assignments":
+            for lid, pid in await session.execute(
+                select(models.LabelAssignment.label_id, models.LabelAssignment.product_id)
+            ):
+                self.assignments.add((lid, pid))
+
+
+def _required(rec: dict, *fields: str) -> list[str]:
+    values = []
+    for f in fields:
+        v = rec.get(f)
+        v = "" if v is None else str(v).strip()
+        if not v:
+            raise ValueError(f"missing {f}")
+        values.append(v)
+    return values
+
+def _product_row(rec: dict, keys: _Keys) -> dict:
+    pid, sku, name, price = _required(rec, "id", "sku", "name", "base_price")
+    if pid in keys.product_ids:
+        raise ValueError(f"product id exists: {pid}")
+    if sku in keys.skus:
+        raise ValueError(f"SKU exists: {sku}")
+    try:
+        base_price = Decimal(price)
+    except InvalidOperation:
+        raise ValueError(f"invalid base_price: {price}")
+    keys.product_ids.add(pid)
+    keys.skus.add(sku)
+    return {"id": pid, "sku": sku, "name": name, "base_price": base_price,
+            "currency": (str(rec.get("currency") or "").strip() or "TRY")}
+
+def _label_row(rec: dict, keys: _Keys) -> dict:
+    lid, code, store = _required(rec, "id", "label_code", "store")
+    if lid in keys.label_ids:
+        raise ValueError(f"label id exists: {lid}")
+    if code in keys.label_codes:
+        raise ValueError(f"label_code exists: {code}")
+    keys.label_ids.add(lid)
+    keys.label_codes.add(code)
+    return {"id": lid, "label_code": code, "store": store}
+
+def _assignment_row(rec: dict, keys: _Keys) -> dict | None:
+    lid, pid = _required(rec, "label_id", "product_id")
+    if lid not in keys.label_ids:
+        raise ValueError(f"label not found: {lid}")
+    if pid not in keys.product_ids:
+        raise ValueError(f"product not found: {pid}")
+    if (lid, pid) in keys.assignments:
+        return None  # assign_label gibi: zaten atanmışsa sessizce geç
+    keys.assignments.add((lid, pid))
+    return {"label_id": lid, "product_id": pid}
+
+_KINDS = {
+    "products": (models.Product, _product_row),
+    "labels": (models.ShelfLabel, _label_row),
+    "assignments": (models.LabelAssignment, _assignment_row),
+}
+
+
+@router.post("/{kind}")
+async def bulk_import(
+    kind: str,
+    file: UploadFile = File(...),
+    format: str | None = Query(None, pattern="^(csv|ndjson)$"),
+    session: AsyncSession = Depends(get_session),
+):
+    if kind not in _KINDS:
+        raise HTTPException(404, "kind must be products, labels or assignments")
+    model, to_row = _KINDS[kind]
+    fmt = format or detect_format(file.filename, file.content_type)
+
+    keys = _Keys()
+    await keys.load(session, kind)
+
+    inserted = skipped = 0
+    errors: list[dict] = []
+    batch: list[dict] = []
+
+    async def flush():
+        nonlocal inserted
+        if batch:
+            await session.execute(insert(model), batch)
+            await session.commit()
+            inserted += len(batch)
+            if kind == "labels":
+                for r in batch:
+                    fanout_index.label_created(r["id"], r["store"])
+            elif kind == "assignments":
+                for r in batch:
+                    fanout_index.assigned(r["label_id"], r["product_id"])
+            batch.clear()
+
+    async for line_no, rec, err in iter_records(file, fmt):
+        if err is None:
+            try:
+                row = to_row(rec, keys)
+            except ValueError as e:
+                err = str(e)
+            else:
+                if row is None:
+                    skipped += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= BATCH:
+                    await flush()
+                continue
+        skipped += 1
+        if len(errors) < MAX_ERRORS:
+            errors.append({"line": line_no, "error": err})
+    await flush()
+    if inserted and kind in ("labels", "assignments"):
+        wall_cache.invalidate()
+
+    # satır başına değil, içe aktarma başına tek yayın
+    await manager.broadcast_json({
+        "type": "import-completed",
+        "kind": kind,
+        "inserted": inserted,
+        "skipped": skipped,
+    })
+    return {"ok": True, "kind": kind, "format": fmt, "inserted": inserted,
+            "skipped": skipped, "errors": errors}
@@ -1,12 +1,20 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.exc import IntegrityError
 from ..database import get_session
 from .. import models
 from ..schemas import LabelCreate, LabelOut, AssignRequest
+from ..pagination import PageParams, NEXT_CURSOR_HEADER
+from ..streaming import wants_ndjson, ndjson_response, stream_rows
+from ..services.wall_cache import wall_cache
 from .live import manager  # <<< canlı yayın
+from ..services.metrics import push_metrics
+from ..services.push_jobs import add_progress_bulk
+from ..services.fanout import fanout_index
 
 router = APIRouter(prefix="/labels", tags=["labels"])
 
@@ -18,10 +26,27 @@ async def delete_label(label_id: str, session: AsyncSession = Depends(get_sessio
     if not lab:
         raise HTTPException(404, "Label not found")
     # önce ilişkili kayıtları sil (FK hatasını önlemek için)
+    job_counts = (await session.execute(
+        select(models.PushJob.request_id, models.PushJob.status, func.count())
+        .where(models.PushJob.label_id == label_id)
+        .group_by(models.PushJob.request_id, models.PushJob.status)
+    )).all()
+    # silinen işler talep ilerleme sayaçlarından da düşülür
+    deltas: dict[str, dict[str, int]] = {}
+    for req_id, status, n in job_counts:
+        d = deltas.setdefault(req_id, {"total": 0})
+        d["total"] -= n
+        if status in ("SUCCESS", "FAILED", "CANCELLED"):
+            d[status.lower()] = d.get(status.lower(), 0) - n
+    await add_progress_bulk(session, deltas)
     await session.execute(delete(models.LabelAssignment).where(models.LabelAssignment.label_id == label_id))
     await session.execute(delete(models.PushJob).where(models.PushJob.label_id == label_id))
     await session.delete(lab)
     await session.commit()
+    wall_cache.label_deleted(label_id)
+    fanout_index.label_deleted(label_id)
+    for _, status, n in job_counts:
+        push_metrics.removed(status, n)
     # canlı: etiket silindi yayını
     await manager.broadcast_json({
         "type": "label-deleted",
@@ -50,23 +75,43 @@ async def create_label(body: LabelCreate, session: AsyncSession = Depends(get_se
         await session.rollback()
         raise HTTPException(400, "Duplicate label id or label_code")
 
+    label_out = {
+        "id": lbl.id, "label_code": lbl.label_code, "store": lbl.store,
+        "battery_pct": lbl.battery_pct, "status": lbl.status,
+    }
+    wall_cache.label_created(label_out)
+    fanout_index.label_created(lbl.id, lbl.store)
+
     # canlı: yeni etiket
     await manager.broadcast_json({
         "type": "label-created",
-        "label": {
-            "id": lbl.id, "label_code": lbl.label_code, "store": lbl.store,
-            "battery_pct": lbl.battery_pct, "status": lbl.status,
-        }
+        "label": label_out,
     })
     return LabelOut.model_validate({
         "id": lbl.id, "label_code": lbl.label_code, "store": lbl.store,
         "battery_pct": lbl.battery_pct, "status": lbl.status
     })
 
+def _label_filters(q, store: Optional[str], status: Optional[str], page: PageParams):
+    if store:
+        q = q.where(models.ShelfLabel.store == store)
+    if status:
+        q = q.where(models.ShelfLabel.status == status)
+    if page.updated_since:
+        q = q.where(models.ShelfLabel.last_seen >= page.updated_since)
+    return q
+
 @router.get("/", response_model=list[LabelOut])
-async def list_labels(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(models.ShelfLabel))
-    items = res.scalars().all()
+async def list_labels(
+    response: Response,
+    store: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    q = _label_filters(select(models.ShelfLabel), store, status, page)
+    res = await session.execute(page.paged(q, models.ShelfLabel.id))
+    items = page.trim(res.scalars().all(), response, lambda l: l.id)
     return [LabelOut.model_validate({
         "id": l.id, "label_code": l.label_code, "store": l.store,
         "battery_pct": l.battery_pct, "status": l.status
@@ -90,45 +135,84 @@ async def assign_label(body: AssignRequest, session: AsyncSession = Depends(get_
         (models.LabelAssignment.product_id == body.product_id)
     ))).scalar_one_or_none()
 
+    product_out = {
+        "id": prod.id, "name": prod.name,
+        "price": float(prod.base_price), "currency": prod.currency
+    }
     if not exists:
         session.add(models.LabelAssignment(label_id=body.label_id, product_id=body.product_id))
         await session.commit()
+        wall_cache.label_assigned(body.label_id, product_out)
+        fanout_index.assigned(body.label_id, body.product_id)
 
     # canlı: etiketin üzerine ürün yaz
     await manager.broadcast_json({
         "type": "label-updated",
         "label_id": body.label_id,
-        "product": {
-            "id": prod.id, "name": prod.name,
-            "price": float(prod.base_price), "currency": prod.currency
-        }
+        "product": product_out
     })
     return {"ok": True}
 
 
 
 # Etiket Duvarı (ilk yükleme için birleşik görünüm)
+def _wall_item(row) -> dict:
+    lbl, prod = row
+    return {
+        "label": {
+            "id": lbl.id, "label_code": lbl.label_code, "store": lbl.store,
+            "battery_pct": lbl.battery_pct, "status": lbl.status
+        },
+        "product": None if prod is None else {
+            "id": prod.id, "name": prod.name,
+            "price": float(prod.base_price), "currency": prod.currency
+        }
+    }
+
 @router.get("/wall")
-async def labels_wall(session: AsyncSession = Depends(get_session)):
+async def labels_wall(
+    request: Request,
+    response: Response,
+    store: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    # veri yalnızca mutasyonlarda değişir; sürüm aynıysa gövde göndermeye gerek yok.
+    # updated_since ise last_seen'e bakar ve o her telemetri flush'ında değişir
+    # (sürüm yalnızca batarya düştüğünde artar); bu sorgular önbelleklenmez
+    cache_headers = {}
+    if not page.updated_since:
+        etag = wall_cache.etag(hashlib.sha1(request.url.query.encode()).hexdigest()[:12])
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=cache_headers)
+        response.headers.update(cache_headers)
+    if page.limit is None and not (store or status or page.updated_since) and not wants_ndjson(request, format):
+        return Response(content=await wall_cache.body(session), media_type="application/json",
+                        headers=cache_headers)
+
     q = (
         select(models.ShelfLabel, models.Product)
         .join(models.LabelAssignment, models.LabelAssignment.label_id == models.ShelfLabel.id, isouter=True)
         .join(models.Product, models.Product.id == models.LabelAssignment.product_id, isouter=True)
     )
+    q = _label_filters(q, store, status, page)
+    if page.limit is not None:
+        # sayfa etiket bazında kesilir; bir etiketin tüm ürünleri aynı sayfada kalır
+        ids_q = page.paged(_label_filters(select(models.ShelfLabel.id), store, status, page), models.ShelfLabel.id)
+        label_ids = page.trim((await session.execute(ids_q)).scalars().all(), response, lambda i: i)
+        q = q.where(models.ShelfLabel.id.in_(label_ids)).order_by(models.ShelfLabel.id)
+
+    if wants_ndjson(request, format):
+        # satır başına bir kart; sunucu tarafında parça parça okunur
+        next_cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        headers = {**cache_headers, **({NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {})}
+        return ndjson_response(stream_rows(q, _wall_item), headers=headers)
+
     rows = (await session.execute(q)).all()
-    out = []
-    for lbl, prod in rows:
-        out.append({
-            "label": {
-                "id": lbl.id, "label_code": lbl.label_code, "store": lbl.store,
-                "battery_pct": lbl.battery_pct, "status": lbl.status
-            },
-            "product": None if prod is None else {
-                "id": prod.id, "name": prod.name,
-                "price": float(prod.base_price), "currency": prod.currency
-            }
-        })
-    return out
+    return [_wall_item(row) for row in rows]
 
 @router.get("/next-id")
 async def next_label_id(session: AsyncSession = Depends(get_session)):
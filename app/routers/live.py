@@ -1,49 +1,184 @@
 from __future__ import annotations
+import asyncio, json, secrets, time
+from collections import deque
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Set
-from fastapi import Depends, HTTPException
+from typing import Optional, Set
+from fastapi import Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..database import get_session
 from .. import models
+from ..streaming import dumps, wants_ndjson, ndjson_response, stream_rows
+from ..services.prom import registry, ws_broadcast
+from ..services.event_bus import event_bus
 import os
 
 
 router = APIRouter(prefix="/live", tags=["live"])
 
+# istemci başına gönderim kuyruğu ve yavaş istemci politikası
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "coalesce")  # drop_oldest / coalesce / disconnect
+# yeniden bağlanan istemciye tekrar gönderilebilecek son olay sayısı
+WS_REPLAY_SIZE = int(os.getenv("WS_REPLAY_SIZE", "2048"))
+# anlık durum mesajları: sıra numarası almaz, tekrar oynatılmaz (bir sonraki zaten günceldir)
+VOLATILE_KINDS = {"metrics", "active-users"}
+
+class _Client:
+    def __init__(self, ws: WebSocket) -> None:
+        self.ws = ws
+        self.queue: deque[tuple[str | None, str]] = deque()  # (mesaj tipi, serileştirilmiş metin)
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+        self.task: asyncio.Task | None = None
+
 class WSManager:
-    def __init__(self) -> None:
-        self.connections: Set[WebSocket] = set()
+    """WebSocket yayıncısı.
+
+    Mesaj bir kez serileştirilir ve her istemcinin sınırlı kuyruğuna konur;
+    gönderimi istemciye ait ayrı bir task yapar. Böylece yavaş bir tablet
+    yayını yapan tarafı (ör. PushRunner) bekletmez. Yayınlar event bus
+    üzerinden diğer süreçlere de gider; tipi "_" ile başlayan mesajlar
+    yalnızca süreçler arasıdır, tarayıcıya iletilmez.
+
+    Olaylar süreç içinde artan bir `seq` alır ve son WS_REPLAY_SIZE tanesi
+    halkada tutulur. İstemci `/live/ws?epoch=..&since=<son seq>` ile yeniden
+    bağlanınca yalnızca kaçırdıkları gönderilir; epoch farklıysa (süreç
+    yeniden başladı / başka worker) ya da halka yetmiyorsa `resync-required`
+    gelir ve istemci listelerini baştan çeker.
+    """
+
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE, overflow: str = WS_OVERFLOW_POLICY,
+                 replay_size: int = WS_REPLAY_SIZE) -> None:
+        self.clients: dict[WebSocket, _Client] = {}
         self.usernames: dict[WebSocket, str] = {}
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self.epoch = secrets.token_hex(6)
+        self.seq = 0
+        self.replay: deque[tuple[int, str, str]] = deque(maxlen=max(1, replay_size))  # (seq, tip, metin)
+        # başka süreçten gelen olaylar için dinleyiciler (ör. önbellek tazeleme)
+        self.remote_hooks: list = []
+
+    @property
+    def connections(self) -> Set[WebSocket]:
+        return set(self.clients)
 
-    async def connect(self, ws: WebSocket):
+    async def connect(self, ws: WebSocket, epoch: Optional[str] = None, since: Optional[int] = None):
         await ws.accept()
-        self.connections.add(ws)
+        client = _Client(ws)
+        # oturum bilgisi ve kaçırılan olaylar, canlı yayına katılmadan (await olmadan)
+        # kuyruğa girer; böylece sıra bozulmaz ve olay iki kez gelmez
+        client.queue.append(("session", dumps({"type": "session", "epoch": self.epoch, "seq": self.seq})))
+        if since is not None:
+            missed = self._missed(epoch, since)
+            if missed is None:
+                client.queue.append(("resync-required", dumps(
+                    {"type": "resync-required", "epoch": self.epoch, "seq": self.seq})))
+            else:
+                client.queue.extend((kind, text) for _, kind, text in missed)
+        client.task = asyncio.create_task(self._sender(client))
+        self.clients[ws] = client
+
+    def _missed(self, epoch: Optional[str], since: int) -> Optional[list[tuple[int, str, str]]]:
+        """`since`'tan sonraki olaylar; tekrar oynatılamıyorsa None."""
+        if epoch != self.epoch or since > self.seq:
+            return None
+        if since == self.seq:
+            return []
+        if not self.replay or self.replay[0][0] > since + 1:
+            return None  # aradaki olaylar halkadan düştü
+        if self.seq - since > self.queue_size:
+            return None  # kuyruğa sığmaz; taşma politikası boşluk açardı
+        return [e for e in self.replay if e[0] > since]
 
     def disconnect(self, ws: WebSocket):
-        self.connections.discard(ws)
+        client = self.clients.pop(ws, None)
         self.usernames.pop(ws, None)
+        if client:
+            client.closed = True
+            client.ready.set()
 
     async def broadcast_json(self, data):
-        to_drop = []
-        for ws in self.connections:
+        start = time.perf_counter()
+        text = dumps(data)
+        kind = (data.get("type") if isinstance(data, dict) else None) or ""
+        self._fanout(kind, text)
+        event_bus.publish(kind, text)
+        ws_broadcast.observe(time.perf_counter() - start, kind)
+
+    def deliver_remote(self, kind: str, text: str):
+        """Event bus'tan gelen (başka süreçte üretilmiş) yayını teslim eder."""
+        self._fanout(kind, text)
+        for hook in self.remote_hooks:
             try:
-                await ws.send_json(data)
+                hook(kind, text)
             except Exception:
-                to_drop.append(ws)
-        for ws in to_drop:
-            self.disconnect(ws)
+                pass
+
+    def _fanout(self, kind: str, text: str):
+        if kind.startswith("_"):
+            return
+        if kind not in VOLATILE_KINDS and text.startswith("{"):
+            # seq yerel olarak damgalanır; bus'a giden metin damgasızdır
+            self.seq += 1
+            text = '{"seq":%d%s' % (self.seq, "," + text[1:] if text != "{}" else "}")
+            self.replay.append((self.seq, kind, text))
+        for client in list(self.clients.values()):
+            self._enqueue(client, kind, text)
+
+    def _enqueue(self, client: _Client, kind: str | None, text: str):
+        if len(client.queue) >= self.queue_size:
+            if self.overflow == "disconnect":
+                self.disconnect(client.ws)
+                asyncio.create_task(self._close(client.ws))
+                return
+            if self.overflow == "coalesce":
+                # bekleyen eski metrik anlık görüntüleri artık değersiz
+                kept = deque(m for m in client.queue if m[0] != "metrics")
+                client.dropped += len(client.queue) - len(kept)
+                client.queue = kept
+            if len(client.queue) >= self.queue_size:
+                client.queue.popleft()
+                client.dropped += 1
+        client.queue.append((kind, text))
+        client.ready.set()
+
+    async def _sender(self, client: _Client):
+        try:
+            while True:
+                while not client.queue:
+                    if client.closed:
+                        return
+                    client.ready.clear()
+                    await client.ready.wait()
+                if client.closed:
+                    return
+                _, text = client.queue.popleft()
+                await client.ws.send_text(text)
+        except Exception:
+            self.disconnect(client.ws)
+
+    async def _close(self, ws: WebSocket):
+        try:
+            await ws.close(code=1013)  # try again later
+        except Exception:
+            pass
 
 manager = WSManager()
 
+registry.gauge("esl_ws_connections", "Açık WebSocket bağlantıları", fn=lambda: len(manager.clients))
+registry.gauge("esl_ws_queued_messages", "İstemci kuyruklarında bekleyen mesajlar",
+               fn=lambda: sum(len(c.queue) for c in manager.clients.values()))
+
 @router.websocket("/ws")
-async def ws_endpoint(ws: WebSocket):
-    await manager.connect(ws)
+async def ws_endpoint(ws: WebSocket, epoch: Optional[str] = None, since: Optional[int] = None):
+    await manager.connect(ws, epoch, since)
     try:
         while True:
             msg = await ws.receive_text()
             try:
-                import json
                 data = json.loads(msg)
                 if isinstance(data, dict) and data.get("type") == "hello" and data.get("user"):
                     manager.usernames[ws] = str(data["user"])[:80]
@@ -56,48 +191,132 @@ async def ws_endpoint(ws: WebSocket):
     except WebSocketDisconnect:
         manager.disconnect(ws)
 
+def _fprice(x):
+    try: return float(x) if x is not None else None
+    except: return None
+
+# tablo adı -> (model, sütun seçimi, satır -> dict)
+_SNAPSHOT_TABLES = {
+    "products": (
+        models.Product,
+        select(models.Product.id, models.Product.sku, models.Product.name,
+               models.Product.base_price, models.Product.currency),
+        lambda r: {"id": r.id, "sku": r.sku, "name": r.name,
+                   "base_price": _fprice(r.base_price), "currency": r.currency},
+    ),
+    "labels": (
+        models.ShelfLabel,
+        select(models.ShelfLabel.id, models.ShelfLabel.label_code, models.ShelfLabel.store,
+               models.ShelfLabel.status, models.ShelfLabel.battery_pct),
+        lambda r: {"id": r.id, "label_code": r.label_code, "store": r.store,
+                   "status": r.status, "battery_pct": r.battery_pct},
+    ),
+    "assignments": (
+        models.LabelAssignment,
+        select(models.LabelAssignment.label_id, models.LabelAssignment.product_id),
+        lambda r: {"label_id": r.label_id, "product_id": r.product_id},
+    ),
+    "price_requests": (
+        models.PriceChangeRequest,
+        select(models.PriceChangeRequest.id, models.PriceChangeRequest.product_id,
+               models.PriceChangeRequest.store, models.PriceChangeRequest.new_price,
+               models.PriceChangeRequest.status),
+        lambda r: {"id": r.id, "product_id": r.product_id, "store": r.store,
+                   "new_price": _fprice(r.new_price), "status": r.status},
+    ),
+    "push_jobs": (
+        models.PushJob,
+        select(models.PushJob.id, models.PushJob.request_id, models.PushJob.label_id,
+               models.PushJob.status, models.PushJob.try_count),
+        lambda r: {"id": r.id, "request_id": r.request_id, "label_id": r.label_id,
+                   "status": r.status, "try_count": r.try_count},
+    ),
+}
+
+async def _change_version(session: AsyncSession) -> tuple[int, int]:
+    row = (await session.execute(select(models.ChangeSeq.value, models.ChangeSeq.floor)
+                                 .where(models.ChangeSeq.id == 1))).first()
+    return (row.value, row.floor) if row else (0, 0)
+
+async def _stream_snapshot(version: int):
+    # ilk satır görüntünün sürümü: istemci /live/changes?since= ile buradan devam eder
+    yield (dumps({"version": version}) + "\n").encode()
+    for table, (_, q, to_dict) in _SNAPSHOT_TABLES.items():
+        async for chunk in stream_rows(q, lambda r, t=table, f=to_dict: {"table": t, "row": f(r)}):
+            yield chunk
+
 @router.get("/db-snapshot")
-async def db_snapshot(session: AsyncSession = Depends(get_session)):
+async def db_snapshot(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    session: AsyncSession = Depends(get_session),
+):
     # Prod'da kapatmak istersen ENV ile koru:
     if os.getenv("LIVE_DEBUG_DB") not in {"1", "true", "True"}:
         # geliştirmede aç:  LIVE_DEBUG_DB=1 uvicorn ...
         raise HTTPException(403, "DB snapshot disabled")
 
-    prods = (await session.execute(select(models.Product))).scalars().all()
-    labels = (await session.execute(select(models.ShelfLabel))).scalars().all()
-    assigns = (await session.execute(select(models.LabelAssignment))).scalars().all()
-    reqs = (await session.execute(select(models.PriceChangeRequest))).scalars().all()
-    jobs = (await session.execute(select(models.PushJob))).scalars().all()
-
-    def fprice(x): 
-        try: return float(x) if x is not None else None
-        except: return None
-
-    return {
-        "products": [
-            {"id": p.id, "sku": p.sku, "name": p.name,
-             "base_price": fprice(p.base_price), "currency": p.currency}
-            for p in prods
-        ],
-        "labels": [
-            {"id": l.id, "label_code": l.label_code, "store": l.store,
-             "status": l.status, "battery_pct": l.battery_pct}
-            for l in labels
-        ],
-        "assignments": [
-            {"label_id": a.label_id, "product_id": a.product_id}
-            for a in assigns
-        ],
-        "price_requests": [
-            {"id": r.id, "product_id": r.product_id, "store": r.store,
-             "new_price": fprice(r.new_price), "status": r.status}
-            for r in reqs
-        ],
-        "push_jobs": [
-            {"id": j.id, "request_id": j.request_id, "label_id": j.label_id,
-             "status": j.status, "try_count": j.try_count}
-            for j in jobs
-        ],
-    }
+    # sürüm satırlardan önce okunur; arada değişen satırlar sonraki delta'da tekrar gelir
+    version, _ = await _change_version(session)
+    if wants_ndjson(request, format):
+        # her satır: {"table": ..., "row": {...}}; tablolar sırayla akar
+        return ndjson_response(_stream_snapshot(version))
+
+    out = {"version": version}
+    for table, (_, q, to_dict) in _SNAPSHOT_TABLES.items():
+        out[table] = [to_dict(r) for r in (await session.execute(q)).all()]
+    return out
+
+_TABLE_NAMES = {model.__tablename__: table for table, (model, _, _) in _SNAPSHOT_TABLES.items()}
+
+@router.get("/changes")
+async def changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(5000, ge=1, le=50000),
+    session: AsyncSession = Depends(get_session),
+):
+    """`since` sürümünden sonra eklenen/güncellenen/silinen satırlar.
+
+    Yanıt: {"version", "more", "resync_required", "upserts": [{"table", "row"}],
+    "deletes": [{"table", "key"}]}. İstemci dönen `version`'ı bir sonraki
+    `since` olarak kullanır; `more` ise hemen tekrar çağırır. `since` budanmış
+    silme kayıtlarından eskiyse `resync_required` döner ve db-snapshot'tan
+    yeniden başlanmalıdır. Maliyet tablo boyutuyla değil değişiklik sayısıyla orantılıdır.
+    """
+    if os.getenv("LIVE_DEBUG_DB") not in {"1", "true", "True"}:
+        raise HTTPException(403, "DB snapshot disabled")
+
+    upto, floor = await _change_version(session)
+    # since=0 boş istemcidir; budanan silmeler onu ilgilendirmez
+    if 0 < since < floor:
+        return {"version": upto, "more": False, "resync_required": True, "upserts": [], "deletes": []}
 
+    # her tablodan sürüm sırasıyla en fazla `limit`+1 satır: birleşik listenin ilk `limit`'i
+    # kesin doğrudur, fazlası varsa `more` döner ve sürüm yalnızca dönen son satıra ilerler
+    items: list[tuple[int, str, dict]] = []
+    for table, (model, q, to_dict) in _SNAPSHOT_TABLES.items():
+        rows = await session.execute(
+            q.add_columns(model.row_version)
+            .where(model.row_version > since, model.row_version <= upto)
+            .order_by(model.row_version).limit(limit + 1)
+        )
+        for r in rows:
+            items.append((r.row_version, "upserts", {"table": table, "row": {**to_dict(r), "_v": r.row_version}}))
+    tombs = await session.execute(
+        select(models.ChangeTombstone.version, models.ChangeTombstone.tbl, models.ChangeTombstone.row_key)
+        .where(models.ChangeTombstone.version > since, models.ChangeTombstone.version <= upto)
+        .order_by(models.ChangeTombstone.version).limit(limit + 1)
+    )
+    for v, tbl, key in tombs:
+        if tbl in _TABLE_NAMES:
+            items.append((v, "deletes", {"table": _TABLE_NAMES[tbl], "key": json.loads(key), "_v": v}))
 
+    items.sort(key=lambda x: x[0])
+    more = len(items) > limit
+    if more:
+        items = items[:limit]
+        upto = items[-1][0]
+    out = {"version": upto, "more": more, "resync_required": False, "upserts": [], "deletes": []}
+    for _, bucket, item in items:
+        out[bucket].append(item)
+    return out
@@ -0,0 +1,9 @@
+from __future__ import annotations
+from fastapi import APIRouter, Response
+from ..services.prom import registry, CONTENT_TYPE
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -5,6 +5,7 @@ from sqlalchemy import select, func
 from ..database import get_session
 from .. import models
 from ..schemas import PriceChangeCreate, ApprovalIn
+from ..services.scheduler import price_scheduler
 
 router = APIRouter(prefix="/price-changes", tags=["price-changes"])
 
@@ -90,6 +91,8 @@ async def approve_price_change(
     # güncellenir ve fiyat geçmişi kaydı o anda oluşturulur.
 
     await session.commit()
+    if req.status == "APPROVED" and req.scheduled_at:
+        price_scheduler.track([req])
     return {"ok": True, "status": req.status}
 
 
@@ -1,11 +1,13 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from ..database import get_session
 from .. import models
 from ..schemas import ProductCreate, ProductOut
+from ..pagination import PageParams
+from datetime import date
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -48,9 +50,16 @@ async def create_product(body: ProductCreate, session: AsyncSession = Depends(ge
     })
 
 @router.get("/", response_model=list[ProductOut])
-async def list_products(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(models.Product))
-    items = res.scalars().all()
+async def list_products(
+    response: Response,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    q = select(models.Product)
+    if page.updated_since:
+        q = q.where(models.Product.updated_at >= page.updated_since)
+    res = await session.execute(page.paged(q, models.Product.id))
+    items = page.trim(res.scalars().all(), response, lambda p: p.id)
     return [ProductOut.model_validate({
         "id": p.id, "sku": p.sku, "name": p.name,
         "base_price": p.base_price, "currency": p.currency
@@ -80,3 +89,23 @@ async def get_price_history(
     q = q.order_by(models.PriceHistory.changed_at.desc()).limit(limit)
     res = await session.execute(q)
     return res.scalars().all()
+
+@router.get("/{product_id}/price-history/daily", response_model=List[schemas.PriceDailyOut])
+async def get_price_history_daily(
+    product_id: str,
+    store: Optional[str] = Query(None),
+    start: Optional[date] = Query(None, description="dahil, YYYY-MM-DD"),
+    end: Optional[date] = Query(None, description="dahil, YYYY-MM-DD"),
+    session: AsyncSession = Depends(get_session),
+):
+    # (product_id, store, day) birincil anahtarı üzerinde aralık taraması
+    r = models.PriceDailyRollup
+    q = select(r).where(r.product_id == product_id)
+    if store:
+        q = q.where(r.store == store)
+    if start:
+        q = q.where(r.day >= start)
+    if end:
+        q = q.where(r.day <= end)
+    res = await session.execute(q.order_by(r.store, r.day))
+    return res.scalars().all()
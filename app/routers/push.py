@@ -1,10 +1,15 @@
 from __future__ import annotations
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from ..database import get_session
 from .. import models
+from ..pagination import PageParams
+from ..services.metrics import push_metrics
+from ..services.push_runner import job_signal
+from ..services.push_jobs import expand_requests, supersede_older, add_progress
 
 router = APIRouter(prefix="/push", tags=["push"])
 
@@ -17,31 +22,53 @@ async def start_push(req_id: str, session: AsyncSession = Depends(get_session)):
         raise HTTPException(404, "Request not found")
     if req.status != "APPROVED":
         raise HTTPException(400, "Request not approved")
+    if req.jobs_total:
+        # zamanlayıcı ya da önceki bir start işleri zaten açmış
+        raise HTTPException(409, "Push already started")
 
-    q = (select(models.LabelAssignment, models.ShelfLabel)
-         .join(models.ShelfLabel, models.ShelfLabel.id == models.LabelAssignment.label_id)
-         .where(models.ShelfLabel.store == req.store,
-                models.LabelAssignment.product_id == req.product_id))
-    rows = (await session.execute(q)).all()
-    if not rows:
-        raise HTTPException(400, "No labels assigned for this product in given store")
+    try:
+        counts = await expand_requests(session, [req])
+        n = counts.get(req.id, 0)
+        if not n:
+            raise HTTPException(400, "No labels assigned for this product in given store")
+        cancelled = await supersede_older(session, [req])
+        await session.commit()
+    except IntegrityError:
+        # eşzamanlı başlatma: iş id'leri çakıştı
+        await session.rollback()
+        raise HTTPException(409, "Push already started")
+    push_metrics.added("QUEUED", n)
+    push_metrics.moved("QUEUED", "CANCELLED", cancelled)
+    job_signal.notify()
+    return {"ok": True, "jobs": n, "cancelled": cancelled}
 
-    for la, label in rows:
-        job = models.PushJob(
-            id=f"job-{req.id}-{label.id}",
-            request_id=req.id,
-            label_id=label.id,
-            status="QUEUED",
-            next_run_at=datetime.utcnow(),
-        )
-        session.add(job)
-    await session.commit()
-    return {"ok": True, "jobs": len(rows)}
+@router.get("/{req_id}/progress")
+async def push_progress(req_id: str, session: AsyncSession = Depends(get_session)):
+    progress = await add_progress(session, req_id)
+    if not progress:
+        raise HTTPException(404, "Request not found")
+    return progress
 
 @router.get("/jobs")
-async def list_jobs(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(models.PushJob))
-    jobs = res.scalars().all()
+async def list_jobs(
+    response: Response,
+    store: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    request_id: Optional[str] = Query(None),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    q = select(models.PushJob)
+    if store:
+        q = q.join(models.ShelfLabel, models.ShelfLabel.id == models.PushJob.label_id).where(models.ShelfLabel.store == store)
+    if status:
+        q = q.where(models.PushJob.status == status)
+    if request_id:
+        q = q.where(models.PushJob.request_id == request_id)
+    if page.updated_since:
+        q = q.where(models.PushJob.updated_at >= page.updated_since)
+    res = await session.execute(page.paged(q, models.PushJob.id))
+    jobs = page.trim(res.scalars().all(), response, lambda j: j.id)
     return [{
         "id": j.id, "status": j.status, "try_count": j.try_count,
         "label_id": j.label_id, "request_id": j.request_id
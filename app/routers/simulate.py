@@ -0,0 +1,16 @@
+from __future__ import annotations
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_session
+from ..schemas import SimulationRule
+from ..services.simulator import price_simulator
+
+router = APIRouter(prefix="/simulate", tags=["simulate"])
+
+@router.post("/")
+async def simulate_rule(body: SimulationRule, request: Request, session: AsyncSession = Depends(get_session)):
+    """Kuralı uygulamadan etkisini hesaplar: talep/etiket sayısı, fiyat değişimi ve push süresi."""
+    if body.floor is not None and body.ceiling is not None and body.floor > body.ceiling:
+        raise HTTPException(400, "floor ceiling'den büyük olamaz")
+    emulator = request.app.state.emulator
+    return await price_simulator.simulate(session, body, emulator.gateway)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional, List
 from pydantic import BaseModel, EmailStr
@@ -49,6 +49,28 @@ class ApprovalIn(BaseModel):
     decision: str  # APPROVE / REJECT
     comment: str | None = None
 
+class CampaignCreate(BaseModel):
+    id: str
+    name: str
+    stores: List[str]
+    product_ids: List[str] | None = None
+    skus: List[str] | None = None
+    percent: Decimal | None = None  # göreli değişim, örn. -10 => %10 indirim
+    new_price: Decimal | None = None  # ya da tüm ürünlere sabit fiyat
+    reason: str | None = None
+    scheduled_at: datetime | None = None
+    approver: str | None = None  # verilirse kampanya oluşturulurken onaylanır
+    start: bool = False  # onaylıysa push işleri de hemen açılır
+
+
+class SimulationRule(BaseModel):
+    percent: float | None = None  # göreli değişim, örn. -10 => %10 indirim
+    round_99: bool = False  # sonucu x.99'a yuvarla
+    floor: float | None = None
+    ceiling: float | None = None
+    stores: List[str] | None = None  # verilmezse tüm mağazalar
+    product_ids: List[str] | None = None  # verilmezse tüm ürünler
+
 
 class PriceHistoryOut(BaseModel):
     id: int
@@ -87,6 +109,24 @@ class PriceHistoryOut(BaseModel):
         class Config:
             orm_mode = True
 
+class PriceDailyOut(BaseModel):
+    product_id: str
+    store: str
+    day: date
+    open_price: float
+    close_price: float
+    min_price: float
+    max_price: float
+    changes: int
+    first_at: datetime
+    last_at: datetime
+
+    if _MODEL_CONFIG[0] == "v2":
+        model_config = _MODEL_CONFIG[1]
+    else:
+        class Config:
+            orm_mode = True
+
 class SignupIn(BaseModel):
     email: EmailStr
     worker_no: str
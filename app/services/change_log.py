@@ -0,0 +1,78 @@
+from __future__ import annotations
+import os
+from datetime import datetime, timedelta
+
+# silme kayıtları bu kadar gün tutulur; daha eski bir sürümden senkronize olmak
+# isteyen istemci tam görüntüyü yeniden çekmelidir (resync_required)
+CHANGES_RETENTION_DAYS = float(os.getenv("CHANGES_RETENTION_DAYS", "7"))
+# uzun yaşayan süreçlerde budama aralığı, sn (zamanlayıcı döngüsünden çalışır)
+CHANGES_PRUNE_EVERY = float(os.getenv("CHANGES_PRUNE_EVERY", "3600"))
+
+# sürümlenen tablolar -> birincil anahtar sütunları
+VERSIONED_TABLES = {
+    "product": ("id",),
+    "shelf_label": ("id",),
+    "label_assignment": ("label_id", "product_id"),
+    "price_change_request": ("id",),
+    "push_job": ("id",),
+}
+
+_BUMP = "UPDATE change_seq SET value = value + 1 WHERE id = 1;"
+_STAMP = "UPDATE {t} SET row_version = (SELECT value FROM change_seq WHERE id = 1) WHERE rowid = NEW.rowid;"
+
+def _triggers(table: str, pk: tuple[str, ...]) -> list[str]:
+    key = ", ".join(f"'{c}', OLD.{c}" for c in pk)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_ins AFTER INSERT ON {table} "
+        f"BEGIN {_BUMP} {_STAMP.format(t=table)} END",
+        # tetikleyicinin kendi row_version yazımı tekrar tetiklemesin
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_upd AFTER UPDATE ON {table} "
+        f"WHEN NEW.row_version IS OLD.row_version "
+        f"BEGIN {_BUMP} {_STAMP.format(t=table)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_del AFTER DELETE ON {table} "
+        f"BEGIN {_BUMP} INSERT INTO change_tombstone (version, tbl, row_key, deleted_at) "
+        f"VALUES ((SELECT value FROM change_seq WHERE id = 1), '{table}', json_object({key}), "
+        f"strftime('%Y-%m-%d %H:%M:%f', 'now')); END",
+    ]
+
+# etiketin mağazası değişince atamalarının (mağaza, ürün) anahtarı da değişir;
+# atamalar yeni sürüm alsın ki yalnızca atama sürümüne bakan okuyucular görsün
+_LABEL_STORE_MOVE = (
+    "CREATE TRIGGER IF NOT EXISTS trg_shelf_label_store_move AFTER UPDATE OF store ON shelf_label "
+    "WHEN NEW.store IS NOT OLD.store "
+    "BEGIN UPDATE label_assignment SET assigned_at = assigned_at WHERE label_id = NEW.id; END"
+)
+
+async def install(conn) -> None:
+    """Sayaç satırını ve sürüm tetikleyicilerini kurar (idempotent).
+
+    Sürüm tek bir global sayaçtan gelir; SQLite yazıcıları sıraladığından
+    commit sırası sürüm sırasıyla aynıdır ve istemci `since` ile kaçırmadan
+    ilerleyebilir.
+    """
+    await conn.exec_driver_sql("INSERT OR IGNORE INTO change_seq (id, value, floor) VALUES (1, 0, 0)")
+    for table, pk in VERSIONED_TABLES.items():
+        for ddl in _triggers(table, pk):
+            await conn.exec_driver_sql(ddl)
+    await conn.exec_driver_sql(_LABEL_STORE_MOVE)
+
+async def backfill(conn, table: str) -> None:
+    """row_version sütunu yeni eklenen tablodaki satırlara sürüm dağıtır."""
+    await conn.exec_driver_sql(f"""
+        UPDATE {table} SET row_version = (SELECT value FROM change_seq WHERE id = 1) + rowid
+    """)
+    await conn.exec_driver_sql(f"""
+        UPDATE change_seq SET value = max(value, (SELECT coalesce(max(row_version), 0) FROM {table}))
+        WHERE id = 1
+    """)
+
+async def prune(conn, days: float = CHANGES_RETENTION_DAYS) -> None:
+    """Eski silme kayıtlarını atar; floor budanan en yüksek sürüme çekilir."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    top = (await conn.exec_driver_sql(
+        "SELECT max(version) FROM change_tombstone WHERE deleted_at < ?", (cutoff.isoformat(" "),)
+    )).scalar()
+    if top is None:
+        return
+    await conn.exec_driver_sql("DELETE FROM change_tombstone WHERE version <= ?", (top,))
+    await conn.exec_driver_sql("UPDATE change_seq SET floor = max(floor, ?) WHERE id = 1", (top,))
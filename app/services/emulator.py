@@ -1,26 +1,58 @@
 from __future__ import annotations
-import asyncio, random
+import asyncio, os, random
 from datetime import datetime
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from ..models import ShelfLabel
+from .label_health import label_health
+
+# mağaza erişim noktası: bir radyo döngüsünde en fazla FRAME_SIZE etiket çerçevesi
+GATEWAY_FRAME_SIZE = int(os.getenv("ESL_FRAME_SIZE", "32"))
+GATEWAY_CYCLE_TIME = float(os.getenv("ESL_CYCLE_TIME", "1.0"))
+
+class StoreGateway:
+    """Bir mağazanın ESL erişim noktası; radyo aynı anda tek bir toplu gönderim yapar."""
+
+    def __init__(self, store: str, frame_size: int, cycle_time: float):
+        self.store = store
+        self.frame_size = max(1, frame_size)
+        self.cycle_time = cycle_time
+        self.lock = asyncio.Lock()
+
+    @property
+    def throughput(self) -> float:
+        """Saniyede taşınabilen etiket güncellemesi (üst sınır)."""
+        return self.frame_size / self.cycle_time if self.cycle_time > 0 else float("inf")
 
 class EmulatorService:
-    def __init__(self, success_rate: float = 0.98, min_delay: float = 0.5, max_delay: float = 1.8):
+    def __init__(self, success_rate: float = 0.98,
+                 frame_size: int = GATEWAY_FRAME_SIZE, cycle_time: float = GATEWAY_CYCLE_TIME):
         self.success_rate = success_rate
-        self.min_delay = min_delay
-        self.max_delay = max_delay
-
-    async def set_price(self, session: AsyncSession, label_id: str, sku: str, price: float) -> bool:
-        await asyncio.sleep(random.uniform(self.min_delay, self.max_delay))
-        success = random.random() < self.success_rate
-
-        # label sağlık güncellemesi
-        res = await session.execute(select(ShelfLabel).where(ShelfLabel.id == label_id))
-        label = res.scalar_one_or_none()
-        if label:
-            label.last_seen = datetime.utcnow()
-            label.battery_pct = max(1, label.battery_pct - (0 if success else 1))
-            await session.commit()
-
-        return success
+        self.frame_size = frame_size
+        self.cycle_time = cycle_time
+        self.gateways: dict[str, StoreGateway] = {}
+
+    def gateway(self, store: str) -> StoreGateway:
+        gw = self.gateways.get(store)
+        if gw is None:
+            gw = self.gateways[store] = StoreGateway(store, self.frame_size, self.cycle_time)
+        return gw
+
+    async def set_prices(self, store: str, batch: list[tuple[str, str, float]]) -> list[tuple[bool, int]]:
+        """Bir mağazadaki etiketlere toplu fiyat gönderir.
+
+        `batch` (label_id, sku, price) listesidir. Mağazanın gateway'i batch'i
+        frame_size'lık çerçevelere böler ve her çerçeve bir radyo döngüsü sürer.
+        Dönüş her öğe için (başarılı mı, ACK süresi ms).
+        """
+        gw = self.gateway(store)
+        results: list[tuple[bool, int]] = []
+        async with gw.lock:
+            start = asyncio.get_running_loop().time()
+            for i in range(0, len(batch), gw.frame_size):
+                frame = batch[i:i + gw.frame_size]
+                await asyncio.sleep(gw.cycle_time)
+                ack_ms = int((asyncio.get_running_loop().time() - start) * 1000)
+                now = datetime.utcnow()
+                for label_id, _, _ in frame:
+                    ok = random.random() < self.success_rate
+                    label_health.record(label_id, ok, now)
+                    results.append((ok, ack_ms))
+        return results
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import asyncio, fcntl, os
+from collections import deque
+from typing import Callable, Optional
+
+# EVENT_BUS=local (varsayılan): yayınlar yalnızca bu sürecin istemcilerine gider.
+# EVENT_BUS=unix:/tmp/esl-bus.sock: aynı makinedeki süreçler (uvicorn worker'ları,
+# python -m app.worker) bir Unix soket hub'ı üzerinden yayınları paylaşır.
+EVENT_BUS = os.getenv("EVENT_BUS", "local")
+# yayınlar bu pencere boyunca biriktirilip tek yazımla gönderilir (ms)
+BUS_BATCH_MS = float(os.getenv("BUS_BATCH_MS", "5"))
+BUS_MAX_PENDING = 10_000
+# hub'da bu kadar yazılmamış veri biriken (takılmış) eş bağlantı kapatılır
+PEER_MAX_BUFFER = 4 * 1024 * 1024
+RECONNECT_DELAY = 0.5
+
+Deliver = Callable[[str, str], None]
+
+
+def _frame(kind: str, text: str) -> bytes:
+    # dumps() çıktısı satır sonu içermez; tip ayrıştırmadan yönlendirme için başta
+    return f"{kind}\t{text}\n".encode()
+
+def _split(buf: bytes) -> tuple[list[bytes], bytes]:
+    """Tam satırları ve kalan yarım satırı ayırır."""
+    end = buf.rfind(b"\n")
+    if end < 0:
+        return [], buf
+    return buf[:end].split(b"\n"), buf[end + 1:]
+
+
+class LocalBus:
+    """Süreç içi varsayılan: yerel teslimatı WSManager zaten yapar."""
+    shared = False
+    is_hub = True  # tek süreç kendi hub'ıdır
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    def publish(self, kind: str, text: str) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class UnixSocketBus:
+    """Aynı makinedeki süreçler arasında yayın paylaşımı.
+
+    Bir kilit dosyasını (flock) alan süreç hub olur ve soketi dinler; diğerleri
+    ona bağlanır. Hub her gelen parçayı gönderen dışındaki eşlere ve kendi
+    istemcilerine iletir. Hub süreci ölürse kilit düşer, bağlantısı kopan
+    süreçlerden biri yeni hub olur. Olaylar geçicidir: bağlantı yokken
+    yayınlananlar yalnızca yerel istemcilere ulaşır.
+    """
+    shared = True
+
+    def __init__(self, path: str, batch_ms: float = BUS_BATCH_MS) -> None:
+        self.path = path
+        self.batch_s = batch_ms / 1000
+        self.deliver: Optional[Deliver] = None
+        self._out: deque[bytes] = deque(maxlen=BUS_MAX_PENDING)
+        self._pending = asyncio.Event()
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: set[asyncio.StreamWriter] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def is_hub(self) -> bool:
+        return self._server is not None
+
+    async def start(self, deliver: Deliver) -> None:
+        if self._tasks:
+            return
+        self.deliver = deliver
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._flush_loop())]
+
+    def publish(self, kind: str, text: str) -> None:
+        self._out.append(_frame(kind, text))
+        self._pending.set()
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        self._tasks = []
+        if self._server:
+            self._server.close()
+        for w in [*self._peers, *([self._writer] if self._writer else [])]:
+            w.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    # ---- bağlantı / hub seçimi ----
+    def _try_lock(self) -> bool:
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            if self._try_lock():
+                # kilit bizde: önceki hub'dan kalan soket dosyası bayat
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+                self._server = await asyncio.start_unix_server(self._on_peer, path=self.path)
+                await asyncio.Event().wait()  # süreç yaşadıkça hub
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            try:
+                await self._read(reader, None)
+            except OSError:
+                pass
+            finally:
+                self._writer.close()
+                self._writer = None
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _on_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._peers.add(writer)
+        try:
+            await self._read(reader, writer)
+        except OSError:
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def _read(self, reader: asyncio.StreamReader, source: Optional[asyncio.StreamWriter]) -> None:
+        rest = b""
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            lines, rest = _split(rest + chunk)
+            if not lines:
+                continue
+            if self.is_hub:
+                self._fanout(b"\n".join(lines) + b"\n", exclude=source)
+            for line in lines:
+                kind, _, text = line.decode().partition("\t")
+                try:
+                    self.deliver(kind, text)
+                except Exception:
+                    pass
+
+    # ---- gönderim ----
+    def _fanout(self, data: bytes, exclude: Optional[asyncio.StreamWriter] = None) -> None:
+        for w in list(self._peers):
+            if w is exclude:
+                continue
+            if w.transport.get_write_buffer_size() > PEER_MAX_BUFFER:
+                self._peers.discard(w)
+                w.close()
+                continue
+            w.write(data)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(self.batch_s)
+            self._pending.clear()
+            data = b"".join(self._out)
+            self._out.clear()
+            if self.is_hub:
+                self._fanout(data)
+            elif self._writer is not None:
+                try:
+                    self._writer.write(data)
+                    await self._writer.drain()
+                except Exception:
+                    pass
+
+
+def create_bus(url: str = EVENT_BUS):
+    if url.startswith("unix:"):
+        path = url[len("unix:"):]
+        if path.startswith("//"):  # unix:///tmp/esl-bus.sock
+            path = path[2:]
+        return UnixSocketBus(path)
+    return LocalBus()
+
+event_bus = create_bus()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+import asyncio, json
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import ChangeSeq, ChangeTombstone, LabelAssignment, ShelfLabel
+
+
+class FanoutIndex:
+    """(mağaza, ürün) -> etiket id'leri için süreç içi indeks.
+
+    Başlangıçta tek taramayla kurulur; etiket oluşturma/silme, atama ve içe
+    aktarma yolları commit sonrası yerinde günceller. Başka süreçlerin (ya da
+    doğrudan veritabanına) yazdıkları kaçırılmasın diye push genişletmesi
+    öncesinde sync() değişiklik günlüğünden (row_version / change_tombstone)
+    son görülen sürümden bu yana değişen etiket ve atamaları uygular; böylece
+    indeks yalnızca günlükle eşitken yetkili sayılır. İndeks hazır değilse ya
+    da eşitlenemezse çağıranlar veritabanına düşer.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.session_factory = None
+        self._by_key: dict[tuple[str, str], list[str]] = {}
+        self._label_store: dict[str, str] = {}
+        self._label_products: dict[str, set[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        # kurulum sürerken gelen değişiklikler; yeni sözlüklere yeniden uygulanır
+        self._replay: Optional[list[tuple]] = None
+        self._stale = False
+        # indeksin değişiklik günlüğünde ulaştığı sürüm
+        self.version = 0
+        self._sync_lock = asyncio.Lock()
+
+    async def start(self, session_factory) -> None:
+        self.session_factory = session_factory
+        await self._rebuild()
+
+    async def _rebuild(self) -> None:
+        while True:
+            self._replay, self._stale = [], False
+            try:
+                async with self.session_factory() as session:
+                    state = await self._load(session)
+            except Exception:
+                self._replay = None
+                raise
+            if not self._stale:
+                break
+        replay, self._replay = self._replay, None
+        self.version, self._by_key, self._label_store, self._label_products = state
+        for op, *args in replay:
+            getattr(self, op)(*args)
+        self.ready = True
+
+    async def _load(self, session: AsyncSession):
+        by_key: dict[tuple[str, str], list[str]] = {}
+        label_store: dict[str, str] = {}
+        label_products: dict[str, set[str]] = {}
+        # sürüm taramadan önce okunur; arada değişenler sync() ile yeniden uygulanır
+        version = await _change_version(session)
+        for lid, store in await session.execute(select(ShelfLabel.id, ShelfLabel.store)):
+            label_store[lid] = store
+        res = await session.stream(
+            select(LabelAssignment.label_id, LabelAssignment.product_id).execution_options(yield_per=50_000)
+        )
+        async for rows in res.partitions():
+            for lid, pid in rows:
+                store = label_store.get(lid)
+                if store is None:
+                    continue
+                by_key.setdefault((store, pid), []).append(lid)
+                label_products.setdefault(lid, set()).add(pid)
+        return version, by_key, label_store, label_products
+
+    async def sync(self) -> bool:
+        """Son sürümden bu yana değişen etiket/atamaları uygular; indeks yetkiliyse True."""
+        if not self.ready or self.session_factory is None:
+            return False
+        async with self._sync_lock:
+            if not self.ready:
+                return False
+            async with self.session_factory() as session:
+                row = (await session.execute(
+                    select(ChangeSeq.value, ChangeSeq.floor).where(ChangeSeq.id == 1))).first()
+                if row is None:
+                    return False
+                upto, floor = row
+                if upto == self.version:
+                    return True
+                if floor > self.version:
+                    # aradaki silme kayıtları budanmış; baştan kurmak gerek
+                    self.invalidate()
+                    return False
+                since = self.version
+                ops: list[tuple[int, tuple]] = []
+                for v, lid, store in await session.execute(
+                    select(ShelfLabel.row_version, ShelfLabel.id, ShelfLabel.store)
+                    .where(ShelfLabel.row_version > since, ShelfLabel.row_version <= upto)
+                ):
+                    ops.append((v, ("label_created", lid, store)))
+                for v, lid, pid in await session.execute(
+                    select(LabelAssignment.row_version, LabelAssignment.label_id, LabelAssignment.product_id)
+                    .where(LabelAssignment.row_version > since, LabelAssignment.row_version <= upto)
+                ):
+                    ops.append((v, ("assigned", lid, pid)))
+                for v, tbl, key in await session.execute(
+                    select(ChangeTombstone.version, ChangeTombstone.tbl, ChangeTombstone.row_key)
+                    .where(ChangeTombstone.version > since, ChangeTombstone.version <= upto,
+                           ChangeTombstone.tbl.in_(("shelf_label", "label_assignment")))
+                ):
+                    k = json.loads(key)
+                    ops.append((v, ("label_deleted", k["id"]) if tbl == "shelf_label"
+                                else ("unassigned", k["label_id"], k["product_id"])))
+            # silinip yeniden eklenen satırlar için sürüm sırası önemli
+            ops.sort(key=lambda x: x[0])
+            for _, (op, *args) in ops:
+                getattr(self, op)(*args)
+            if not self.ready:
+                return False  # bilinmeyen etikete atama: yeniden kuruluyor
+            self.version = upto
+            return True
+
+    def invalidate(self) -> None:
+        """İndeksi yeniden kurdurur; o sırada çağıranlar veritabanını kullanır."""
+        self.ready = False
+        if self._replay is not None:
+            self._stale = True  # süren kurulum bu değişikliği görmemiş olabilir
+            return
+        if self.session_factory is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._rebuild())
+
+    def labels(self, store: str, product_id: str) -> list[str]:
+        return self._by_key.get((store, product_id), [])
+
+    # ---- yerinde güncellemeler (idempotent; kurulum sonrası tekrar uygulanabilir) ----
+    def _log(self, *op) -> None:
+        if self._replay is not None:
+            self._replay.append(op)
+
+    def label_created(self, label_id: str, store: str) -> None:
+        self._log("label_created", label_id, store)
+        old = self._label_store.get(label_id)
+        self._label_store[label_id] = store
+        if old is not None and old != store:
+            # mağaza değişti: atamaları yeni anahtara taşı
+            for pid in self._label_products.get(label_id, ()):
+                self._drop_key(old, pid, label_id)
+                self._by_key.setdefault((store, pid), []).append(label_id)
+
+    def assigned(self, label_id: str, product_id: str) -> None:
+        store = self._label_store.get(label_id)
+        if store is None:
+            self.invalidate()
+            return
+        self._log("assigned", label_id, product_id)
+        products = self._label_products.setdefault(label_id, set())
+        if product_id not in products:
+            products.add(product_id)
+            self._by_key.setdefault((store, product_id), []).append(label_id)
+
+    def unassigned(self, label_id: str, product_id: str) -> None:
+        self._log("unassigned", label_id, product_id)
+        products = self._label_products.get(label_id)
+        if products and product_id in products:
+            products.discard(product_id)
+            self._drop_key(self._label_store.get(label_id), product_id, label_id)
+
+    def label_deleted(self, label_id: str) -> None:
+        self._log("label_deleted", label_id)
+        store = self._label_store.pop(label_id, None)
+        for pid in self._label_products.pop(label_id, ()):
+            self._drop_key(store, pid, label_id)
+
+    def _drop_key(self, store: Optional[str], product_id: str, label_id: str) -> None:
+        ids = self._by_key.get((store, product_id))
+        if ids and label_id in ids:
+            ids.remove(label_id)
+            if not ids:
+                del self._by_key[(store, product_id)]
+
+    def on_remote_event(self, kind: str, text: str) -> None:
+        """Başka süreçteki etiket/atama değişikliğini indekse yansıtır."""
+        if kind == "label-created":
+            lbl = json.loads(text)["label"]
+            self.label_created(lbl["id"], lbl["store"])
+        elif kind == "label-deleted":
+            self.label_deleted(json.loads(text)["label_id"])
+        elif kind == "label-updated":
+            data = json.loads(text)
+            self.assigned(data["label_id"], data["product"]["id"])
+        elif kind == "import-completed" and json.loads(text).get("kind") in ("labels", "assignments"):
+            self.invalidate()
+
+async def _change_version(session: AsyncSession) -> int:
+    return (await session.execute(select(ChangeSeq.value).where(ChangeSeq.id == 1))).scalar() or 0
+
+fanout_index = FanoutIndex()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+import codecs, csv, json
+from typing import AsyncIterator
+
+READ_SIZE = 64 * 1024
+
+async def _iter_lines(upload) -> AsyncIterator[str]:
+    # yüklemeyi parça parça oku; tüm dosyayı belleğe almadan satır üret
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    while True:
+        chunk = await upload.read(READ_SIZE)
+        if not chunk:
+            break
+        text = tail + decoder.decode(chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+def detect_format(filename: str | None, content_type: str | None) -> str:
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "ndjson"
+    return "csv"
+
+async def iter_records(upload, fmt: str) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """Satır satır kayıt üretir: (satır no, kayıt, hata).
+
+    CSV'de ilk satır başlıktır ve her kayıt tek satırdır; NDJSON'da her satır
+    bir JSON nesnesidir. Boş satırlar atlanır.
+    """
+    header: list[str] | None = None
+    line_no = 0
+    async for line in _iter_lines(upload):
+        line_no += 1
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                rec = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(rec, dict):
+                yield line_no, None, "expected a JSON object"
+                continue
+            yield line_no, rec, None
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if len(values) != len(header):
+            yield line_no, None, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        yield line_no, {k: v.strip() for k, v in zip(header, values)}, None
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import asyncio, os
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import update, select, bindparam, func
+from ..models import ShelfLabel
+from .wall_cache import wall_cache
+from ..routers.live import manager
+
+LABEL_HEALTH_FLUSH = float(os.getenv("LABEL_HEALTH_FLUSH", "1.0"))
+
+class LabelHealthBuffer:
+    """Emülatörden gelen etiket telemetrisi için write-behind tampon.
+
+    Her ACK'te veritabanına yazmak yerine label id başına son görülme zamanı
+    ve biriken batarya düşüşü tutulur; tampon her `interval` saniyede bir tek
+    toplu UPDATE (executemany) ile boşaltılır, kapanışta da son kez yazılır.
+    """
+
+    def __init__(self, interval: float = LABEL_HEALTH_FLUSH) -> None:
+        self.interval = interval
+        self.session_factory = None
+        self._pending: dict[str, list] = {}  # label_id -> [last_seen, battery_drop]
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def record(self, label_id: str, success: bool, seen_at: Optional[datetime] = None) -> None:
+        seen_at = seen_at or datetime.utcnow()
+        entry = self._pending.get(label_id)
+        if entry is None:
+            self._pending[label_id] = [seen_at, 0 if success else 1]
+        else:
+            entry[0] = max(entry[0], seen_at)
+            entry[1] += 0 if success else 1
+
+    async def start(self, session_factory) -> None:
+        self.session_factory = session_factory
+        if not self._task:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass
+
+    async def flush(self) -> int:
+        if not self._pending or self.session_factory is None:
+            return 0
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            params = [{"b_id": lid, "b_seen": seen, "b_drop": drop} for lid, (seen, drop) in pending.items()]
+            t = ShelfLabel.__table__
+            stmt = (update(t)
+                    .where(t.c.id == bindparam("b_id"))
+                    .values(last_seen=bindparam("b_seen"),
+                            battery_pct=func.max(1, t.c.battery_pct - bindparam("b_drop"))))
+            drained = [lid for lid, (_, drop) in pending.items() if drop]
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(stmt, params)
+                    await session.commit()
+                    batteries = []
+                    if drained:
+                        batteries = (await session.execute(
+                            select(ShelfLabel.id, ShelfLabel.battery_pct).where(ShelfLabel.id.in_(drained))
+                        )).all()
+            except Exception:
+                # yazılamadı: bu arada gelenlerle birleştirip bir sonraki turda dene
+                for lid, (seen, drop) in pending.items():
+                    entry = self._pending.get(lid)
+                    if entry is None:
+                        self._pending[lid] = [seen, drop]
+                    else:
+                        entry[0] = max(entry[0], seen)
+                        entry[1] += drop
+                raise
+            for lid, battery in batteries:
+                wall_cache.label_changed(lid, battery_pct=battery)
+            if batteries:
+                # diğer süreçlerin önbellekleri için (tarayıcıya gitmez)
+                await manager.broadcast_json({"type": "_label-battery", "labels": [list(b) for b in batteries]})
+            return len(params)
+
+label_health = LabelHealthBuffer()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import time
+from typing import Optional
+
+
+def _bucket(ms: int) -> int:
+    # HDR benzeri log-lineer kova: 16'ya kadar birebir, sonrasında her ikinin
+    # kuvveti aralığı 16 alt kovaya bölünür (~%6 göreli hata)
+    if ms < 16:
+        return ms
+    shift = ms.bit_length() - 5
+    return 16 * shift + (ms >> shift)
+
+def _bucket_value(idx: int) -> int:
+    if idx < 32:
+        return idx
+    shift, mantissa = divmod(idx, 16)
+    shift -= 1
+    mantissa += 16
+    lo = mantissa << shift
+    return lo + ((1 << shift) - 1) // 2
+
+
+class LatencyRecorder:
+    """Sabit bellekli, kayan zaman pencereli gecikme histogramı.
+
+    Pencere `slot_s` saniyelik dilimlerden oluşan bir halkadır; her dilim
+    seyrek bir kova sayacı tutar. Eski dilimler üzerine yazılarak düşer.
+    """
+
+    def __init__(self, window_s: float = 60.0, slot_s: float = 1.0) -> None:
+        self.window_s = window_s
+        self.slot_s = slot_s
+        self._n = max(1, int(window_s / slot_s))
+        # her dilim: [dilim_no, adet, toplam_ms, max_ms, {kova: adet}]
+        self._slots: list[list] = [[-1, 0, 0, 0, {}] for _ in range(self._n)]
+
+    def record(self, ms: int, now: Optional[float] = None) -> None:
+        ms = max(0, int(ms))
+        tick = int((time.monotonic() if now is None else now) / self.slot_s)
+        slot = self._slots[tick % self._n]
+        if slot[0] != tick:
+            slot[0], slot[1], slot[2], slot[3] = tick, 0, 0, 0
+            slot[4] = {}
+        slot[1] += 1
+        slot[2] += ms
+        if ms > slot[3]:
+            slot[3] = ms
+        b = _bucket(ms)
+        slot[4][b] = slot[4].get(b, 0) + 1
+
+    def summary(self, now: Optional[float] = None) -> dict:
+        tick = int((time.monotonic() if now is None else now) / self.slot_s)
+        oldest = tick - self._n + 1
+        count = total = peak = 0
+        buckets: dict[int, int] = {}
+        for idx, n, s, m, b in self._slots:
+            if idx < oldest or n == 0:
+                continue
+            count += n
+            total += s
+            peak = max(peak, m)
+            for k, v in b.items():
+                buckets[k] = buckets.get(k, 0) + v
+
+        out = {
+            "count": count,
+            "throughput": round(count / self.window_s, 3),
+            "avg": int(total / count) if count else None,
+            "p50": None, "p95": None, "p99": None,
+            "max": peak if count else None,
+        }
+        if count:
+            targets = [("p50", 0.50), ("p95", 0.95), ("p99", 0.99)]
+            seen = 0
+            for k in sorted(buckets):
+                seen += buckets[k]
+                while targets and seen >= targets[0][1] * count:
+                    name, _ = targets.pop(0)
+                    out[name] = min(_bucket_value(k), peak)
+                if not targets:
+                    break
+        return out
+
+
+class KeyedLatency:
+    """Genel pencere + anahtar (mağaza) bazında ayrı pencereler."""
+
+    def __init__(self, window_s: float = 60.0, slot_s: float = 1.0) -> None:
+        self.window_s = window_s
+        self.slot_s = slot_s
+        self.all = LatencyRecorder(window_s, slot_s)
+        self.by_key: dict[str, LatencyRecorder] = {}
+
+    def record(self, key: str, ms: int) -> None:
+        now = time.monotonic()
+        self.all.record(ms, now)
+        rec = self.by_key.get(key)
+        if rec is None:
+            rec = self.by_key[key] = LatencyRecorder(self.window_s, self.slot_s)
+        rec.record(ms, now)
+
+    def summary(self) -> dict:
+        now = time.monotonic()
+        return {
+            "all": self.all.summary(now),
+            "by_key": {k: r.summary(now) for k, r in sorted(self.by_key.items())},
+        }
@@ -0,0 +1,55 @@
+from __future__ import annotations
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import PushJob
+from .prom import registry
+
+
+STATUSES = ("QUEUED", "PROCESSING", "SUCCESS", "FAILED", "CANCELLED")
+
+class PushMetrics:
+    """Push job durum sayaçları.
+
+    Başlangıçta tek bir GROUP BY ile doldurulur, sonrasında işler durum
+    değiştirdikçe artımlı güncellenir; yayın maliyeti tablo boyutundan bağımsızdır.
+    """
+
+    def __init__(self) -> None:
+        self.counts: dict[str, int] = dict.fromkeys(STATUSES, 0)
+
+    async def seed(self, session: AsyncSession) -> None:
+        before = dict(self.counts)
+        rows = await session.execute(select(PushJob.status, func.count()).group_by(PushJob.status))
+        counts = dict.fromkeys(STATUSES, 0)
+        for status, n in rows:
+            counts[status] = n
+        # sorgu beklenirken yapılan yerel geçişler kaybolmasın: farkı üstüne ekle
+        for status, n in self.counts.items():
+            counts[status] = max(0, counts.get(status, 0) + n - before.get(status, 0))
+        self.counts = counts
+
+    def added(self, status: str, n: int = 1) -> None:
+        self.counts[status] = self.counts.get(status, 0) + n
+
+    def removed(self, status: str, n: int = 1) -> None:
+        self.counts[status] = max(0, self.counts.get(status, 0) - n)
+
+    def moved(self, old: str, new: str, n: int = 1) -> None:
+        if old != new:
+            self.removed(old, n)
+            self.added(new, n)
+
+    def snapshot(self) -> dict:
+        return {
+            "total": sum(self.counts.values()),
+            "success": self.counts.get("SUCCESS", 0),
+            "failed": self.counts.get("FAILED", 0),
+            "queued": self.counts.get("QUEUED", 0),
+            "processing": self.counts.get("PROCESSING", 0),
+            "cancelled": self.counts.get("CANCELLED", 0),  # daha yeni fiyatla geçersiz kalanlar
+        }
+
+push_metrics = PushMetrics()
+
+registry.gauge("esl_push_jobs", "Duruma göre push işleri (kuyruk derinliği)", ("status",),
+               fn=lambda: {(s,): n for s, n in push_metrics.counts.items()})
@@ -0,0 +1,59 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import PriceDailyRollup
+
+_REBUILD_SQL = """
+INSERT INTO price_daily_rollup
+  (product_id, store, day, open_price, close_price, min_price, max_price, changes, first_at, last_at)
+WITH h AS (
+  SELECT product_id, store, date(changed_at) AS day, changed_at,
+         COALESCE(old_price, new_price) AS open_p, new_price,
+         ROW_NUMBER() OVER (PARTITION BY product_id, store, date(changed_at) ORDER BY changed_at, id) AS rn_first,
+         ROW_NUMBER() OVER (PARTITION BY product_id, store, date(changed_at) ORDER BY changed_at DESC, id DESC) AS rn_last
+  FROM price_history
+)
+SELECT product_id, store, day,
+       MAX(CASE WHEN rn_first = 1 THEN open_p END),
+       MAX(CASE WHEN rn_last = 1 THEN new_price END),
+       MIN(MIN(open_p, new_price)), MAX(MAX(open_p, new_price)),
+       COUNT(*), MIN(changed_at), MAX(changed_at)
+FROM h GROUP BY product_id, store, day
+"""
+
+async def record_change(session: AsyncSession, product_id: str, store: str,
+                        old_price: Optional[float], new_price: float, changed_at: datetime) -> None:
+    """Bir PriceHistory kaydını günlük özete işler (tek upsert, aynı transaction).
+
+    Geç gelen (changed_at'i günün mevcut aralığından önce olan) kayıtlar
+    açılış/kapanış fiyatını sırasına göre doğru günceller.
+    """
+    open_p = float(old_price) if old_price is not None else float(new_price)
+    new_p = float(new_price)
+    stmt = sqlite_insert(PriceDailyRollup).values(
+        product_id=product_id, store=store, day=changed_at.date(),
+        open_price=open_p, close_price=new_p,
+        min_price=min(open_p, new_p), max_price=max(open_p, new_p),
+        changes=1, first_at=changed_at, last_at=changed_at,
+    )
+    t, ex = PriceDailyRollup, stmt.excluded
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[t.product_id, t.store, t.day],
+        set_={
+            "open_price": case((ex.first_at < t.first_at, ex.open_price), else_=t.open_price),
+            "close_price": case((ex.last_at >= t.last_at, ex.close_price), else_=t.close_price),
+            "min_price": func.min(t.min_price, ex.min_price),
+            "max_price": func.max(t.max_price, ex.max_price),
+            "changes": t.changes + 1,
+            "first_at": func.min(t.first_at, ex.first_at),
+            "last_at": func.max(t.last_at, ex.last_at),
+        },
+    ))
+
+async def rebuild(conn) -> None:
+    """Özet tabloyu ham geçmişten yeniden kurar (ilk kurulum / geri doldurma)."""
+    await conn.exec_driver_sql("DELETE FROM price_daily_rollup")
+    await conn.exec_driver_sql(_REBUILD_SQL)
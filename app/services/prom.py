@@ -0,0 +1,153 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+# Prometheus metin formatı için hafif kayıt defteri; prometheus_client
+# bağımlılığı olmadan sayaç/gauge/histogram tutar. Ölçüm yolu bir dict
+# araması ve birkaç tamsayı artırımıdır, kilit yoktur (tek event loop).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name}: {self.label_names} etiketleri bekleniyor")
+        return labels
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        super().__init__(name, doc, labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, n: float = 1) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + n
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(self.label_names, k)} {_num(v)}" for k, v in self.values.items()]
+
+
+class Gauge(_Metric):
+    """Değeri ya set() ile verilir ya da toplama anında `fn` ile okunur."""
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=(), fn: Optional[Callable[[], dict | float]] = None):
+        super().__init__(name, doc, labels)
+        self.values: dict[tuple, float] = {}
+        self.fn = fn
+
+    def set(self, value: float, *labels) -> None:
+        self.values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        values = self.values
+        if self.fn is not None:
+            got = self.fn()
+            values = got if isinstance(got, dict) else {(): got}
+        return [f"{self.name}{_labels(self.label_names, k if isinstance(k, tuple) else (k,))} {_num(v)}"
+                for k, v in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        # etiket -> [kova sayaçları..., +Inf, toplam]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        row = self.values.get(key)
+        if row is None:
+            row = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def render(self) -> list[str]:
+        out = []
+        for key, row in self.values.items():
+            acc = 0
+            for le, n in zip((*self.buckets, float("inf")), row):
+                acc += n
+                le_label = 'le="%s"' % _num(le)
+                out.append(f"{self.name}_bucket{_labels(self.label_names, key, le_label)} {acc}")
+            lbl = _labels(self.label_names, key)
+            out.append(f"{self.name}_sum{lbl} {row[-1]!r}")
+            out.append(f"{self.name}_count{lbl} {acc}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, doc, labels=()) -> Counter:
+        return self.metrics.get(name) or self.register(Counter(name, doc, labels))
+
+    def gauge(self, name, doc, labels=(), fn=None) -> Gauge:
+        return self.metrics.get(name) or self.register(Gauge(name, doc, labels, fn))
+
+    def histogram(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.get(name) or self.register(Histogram(name, doc, labels, buckets))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for m in self.metrics.values():
+            lines += m.header()
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# --- uygulama metrikleri ---
+http_requests = registry.counter("esl_http_requests_total", "HTTP istekleri", ("method", "route", "status"))
+http_latency = registry.histogram("esl_http_request_seconds", "HTTP istek süresi", ("method", "route"))
+
+push_claim = registry.histogram("esl_push_claim_seconds", "İş sahiplenme (claim) süresi")
+push_claimed = registry.counter("esl_push_claimed_total", "Sahiplenilen iş sayısı", ("store",))
+push_dispatch = registry.histogram("esl_push_dispatch_seconds", "Gateway'e toplu gönderim süresi", ("store",))
+push_ack = registry.histogram("esl_push_ack_seconds", "Etiket ACK süresi", ("store",),
+                              buckets=(.05, .1, .25, .5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0))
+push_results = registry.counter("esl_push_results_total", "Gönderim sonuçları", ("store", "result"))
+
+ws_broadcast = registry.histogram("esl_ws_broadcast_seconds", "WebSocket yayın (fan-out) süresi", ("type",),
+                                  buckets=(.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .1))
+
+db_session = registry.histogram("esl_db_session_seconds", "İstek başına DB session ömrü")
+db_commit = registry.histogram("esl_db_commit_seconds", "DB commit süresi")
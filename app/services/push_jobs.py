@@ -0,0 +1,180 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Iterable
+from sqlalchemy import select, insert, update, bindparam, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import LabelAssignment, ShelfLabel, PushJob, PriceChangeRequest
+from .fanout import fanout_index
+
+# toplu INSERT/IN sorgularında tek seferde gönderilen satır sayısı
+CHUNK = 500
+
+_PROGRESS_COLS = ("total", "success", "failed", "cancelled")
+
+# bir fiyatın yürürlüğe girdiği an: zamanlanmışsa scheduled_at, değilse oluşturulma.
+# "daha yeni talep" bu sıraya göre belirlenir; eski tarihte oluşturulmuş ama ileri
+# tarihe zamanlanmış bir fiyat, bugün başlatılan anlık değişiklikle iptal edilmez
+EFFECTIVE_AT = func.coalesce(PriceChangeRequest.scheduled_at, PriceChangeRequest.created_at)
+
+def effective_at(r) -> datetime:
+    return r.scheduled_at or r.created_at or datetime.min
+
+def chunks(items: list, size: int = CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def progress_dict(req_id: str, status: str, total: int, success: int, failed: int, cancelled: int) -> dict:
+    return {
+        "request_id": req_id, "status": status,
+        "total": total, "success": success, "failed": failed, "cancelled": cancelled,
+        "pending": max(0, total - success - failed - cancelled),
+    }
+
+async def add_progress(session: AsyncSession, req_id: str, **delta: int) -> dict | None:
+    """Tek talebin sayaçlarını artırır ve güncel ilerlemeyi döner (RETURNING)."""
+    cols = (PriceChangeRequest.id, PriceChangeRequest.status,
+            *(getattr(PriceChangeRequest, f"jobs_{k}") for k in _PROGRESS_COLS))
+    values = {f"jobs_{k}": getattr(PriceChangeRequest, f"jobs_{k}") + n for k, n in delta.items() if n}
+    if values:
+        stmt = (update(PriceChangeRequest).where(PriceChangeRequest.id == req_id).values(**values)
+                .returning(*cols).execution_options(synchronize_session=False))
+    else:
+        stmt = select(*cols).where(PriceChangeRequest.id == req_id)
+    row = (await session.execute(stmt)).one_or_none()
+    return progress_dict(*row) if row else None
+
+async def add_progress_bulk(session: AsyncSession, deltas: dict[str, dict[str, int]]) -> None:
+    """Birçok talebin sayaçlarını tek executemany UPDATE ile artırır."""
+    if not deltas:
+        return
+    t = PriceChangeRequest.__table__
+    stmt = (update(t)
+            .where(t.c.id == bindparam("b_id"))
+            .values(**{f"jobs_{k}": t.c[f"jobs_{k}"] + bindparam(f"b_{k}") for k in _PROGRESS_COLS}))
+    params = [{"b_id": rid, **{f"b_{k}": d.get(k, 0) for k in _PROGRESS_COLS}} for rid, d in deltas.items()]
+    for part in chunks(params):
+        await session.execute(stmt, part)
+
+async def _labels_from_db(session: AsyncSession, reqs: list) -> dict[tuple[str, str], list[str]]:
+    stores = {r.store for r in reqs}
+    labels_by_key: dict[tuple[str, str], list[str]] = {}
+    for part in chunks(sorted({r.product_id for r in reqs})):
+        q = (select(LabelAssignment.product_id, ShelfLabel.store, ShelfLabel.id)
+             .join(ShelfLabel, ShelfLabel.id == LabelAssignment.label_id)
+             .where(LabelAssignment.product_id.in_(part), ShelfLabel.store.in_(stores)))
+        for product_id, store, label_id in await session.execute(q):
+            labels_by_key.setdefault((store, product_id), []).append(label_id)
+    return labels_by_key
+
+async def expand_requests(session: AsyncSession, reqs: Iterable) -> dict[str, int]:
+    """Onaylı talepleri etiket başına QUEUED PushJob satırlarına açar.
+
+    Etiketler bellekteki fan-out indeksinden bulunur; indeks değişiklik
+    günlüğüyle eşitlenemezse ya da bir talep için etiket döndürmezse o
+    talepler tek geçişte (ürün kümesi başına bir sorgu) veritabanından
+    okunur. İşler parça parça executemany ile eklenir.
+    `scheduled_at` ileri tarihliyse işler o ana vadelenir. Commit çağıranındır.
+    Dönüş: talep id -> açılan iş sayısı.
+    """
+    reqs = list(reqs)
+    labels_by_key: dict[tuple[str, str], list[str]] = {}
+    if await fanout_index.sync():
+        for r in reqs:
+            ids = fanout_index.labels(r.store, r.product_id)
+            if ids:
+                labels_by_key[(r.store, r.product_id)] = list(ids)
+    missing = [r for r in reqs if (r.store, r.product_id) not in labels_by_key]
+    if missing:
+        labels_by_key.update(await _labels_from_db(session, missing))
+
+    now = datetime.utcnow()
+    counts: dict[str, int] = {}
+    rows = []
+    for r in reqs:
+        label_ids = labels_by_key.get((r.store, r.product_id), [])
+        counts[r.id] = len(label_ids)
+        run_at = max(now, r.scheduled_at) if r.scheduled_at else now
+        for label_id in label_ids:
+            rows.append({
+                "id": f"job-{r.id}-{label_id}",
+                "request_id": r.id,
+                "label_id": label_id,
+                "try_count": 0,
+                "status": "QUEUED",
+                "next_run_at": run_at,
+                "updated_at": now,
+            })
+    for part in chunks(rows):
+        await session.execute(insert(PushJob), part)
+    await add_progress_bulk(session, {rid: {"total": n} for rid, n in counts.items() if n})
+    return counts
+
+async def mark_no_labels(session: AsyncSession, req_ids: list[str]) -> None:
+    """Etiketi olmayan onaylı talepleri NO_LABELS ile kapatır (sonsuza dek APPROVED kalmasın)."""
+    for part in chunks(req_ids):
+        await session.execute(
+            update(PriceChangeRequest)
+            .where(PriceChangeRequest.id.in_(part), PriceChangeRequest.status == "APPROVED",
+                   PriceChangeRequest.jobs_total == 0)
+            .values(status="NO_LABELS")
+            .execution_options(synchronize_session=False)
+        )
+
+async def supersede_older(session: AsyncSession, reqs: Iterable) -> int:
+    """Aynı (ürün, mağaza) için daha yeni talebi açılan eski talepleri iptal eder.
+
+    "Eski", yürürlük anı (EFFECTIVE_AT) daha erken olan demektir; yeni
+    talepten sonraya zamanlanmış fiyatlar dokunulmadan kalır. Eski talepler
+    SUPERSEDED olur ve kuyruktaki (QUEUED) işleri CANCELLED'a çekilir; böylece
+    etiketler iki kez yazılmaz ve eski fiyat en son inmez.
+    Commit çağıranındır. Dönüş: iptal edilen iş sayısı.
+    """
+    newest: dict[tuple[str, str], PriceChangeRequest] = {}
+    now = datetime.utcnow()
+    for r in reqs:
+        if r.scheduled_at and r.scheduled_at > now:
+            continue  # ileri tarihli fiyat, vakti gelene kadar bugünkünü geçersiz kılmaz
+        cur = newest.get((r.product_id, r.store))
+        if cur is None or effective_at(r) > effective_at(cur):
+            newest[(r.product_id, r.store)] = r
+    if not newest:
+        return 0
+
+    new_ids = {r.id for r in newest.values()}
+    stores = {store for _, store in newest}
+    older: list[str] = []
+    for part in chunks(sorted({pid for pid, _ in newest})):
+        rows = await session.execute(
+            select(PriceChangeRequest.id, PriceChangeRequest.product_id,
+                   PriceChangeRequest.store, EFFECTIVE_AT)
+            .where(PriceChangeRequest.product_id.in_(part),
+                   PriceChangeRequest.store.in_(stores),
+                   PriceChangeRequest.status == "APPROVED")
+        )
+        for rid, pid, store, eff in rows:
+            n = newest.get((pid, store))
+            if n is None or rid in new_ids:
+                continue
+            if (eff or datetime.min) < effective_at(n):
+                older.append(rid)
+
+    per_request: dict[str, dict[str, int]] = {}
+    for part in chunks(older):
+        await session.execute(
+            update(PriceChangeRequest)
+            .where(PriceChangeRequest.id.in_(part))
+            .values(status="SUPERSEDED")
+            .execution_options(synchronize_session=False)
+        )
+        res = await session.execute(
+            update(PushJob)
+            .where(PushJob.request_id.in_(part), PushJob.status == "QUEUED")
+            .values(status="CANCELLED", last_error="superseded", updated_at=now)
+            .returning(PushJob.request_id)
+            .execution_options(synchronize_session=False)
+        )
+        for rid in res.scalars():
+            d = per_request.setdefault(rid, {"cancelled": 0})
+            d["cancelled"] += 1
+    await add_progress_bulk(session, per_request)
+    return sum(d["cancelled"] for d in per_request.values())
@@ -1,146 +1,451 @@
 from __future__ import annotations
-import asyncio
+import asyncio, heapq, json, logging, os, socket, time, uuid
 from datetime import datetime, timedelta
-from statistics import mean
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import PushJob, PriceChangeRequest, Product, ShelfLabel, PriceHistory
 from .emulator import EmulatorService
+from .latency import KeyedLatency
+from .metrics import push_metrics
+from .prom import push_claim, push_claimed, push_dispatch, push_ack, push_results
+from .sql_profile import profile
+from .wall_cache import wall_cache
+from .push_jobs import add_progress, EFFECTIVE_AT, effective_at
+from . import price_rollup
 from ..routers.live import manager
+from .event_bus import event_bus
+from ..streaming import dumps
 
+log = logging.getLogger("esl.push")
 
 MAX_RETRY = 3
+# iş kirası: PROCESSING'te kalan (örn. süreç çöktü) işler kira bitince başka worker'a geçer
+PROCESSING_TIMEOUT = timedelta(seconds=float(os.getenv("PUSH_LEASE", "30")))
+# süreç kimliği; kira sahibi olarak işlere yazılır
+WORKER_ID = os.getenv("PUSH_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+PUSH_WORKERS = int(os.getenv("PUSH_WORKERS", "4"))
+# başka süreçlerin eklediği işleri kaçırmamak için en uzun boşta bekleme
+PUSH_IDLE_MAX = float(os.getenv("PUSH_IDLE_MAX", "30"))
+# worker turu hata verirse yeniden denemeden önce bekleme
+PUSH_ERROR_BACKOFF = float(os.getenv("PUSH_ERROR_BACKOFF", "1.0"))
+METRICS_INTERVAL = 1.0
+# diğer süreçlerin yaptığı geçişleri sayaçlara yansıtmak için periyodik yeniden sayım;
+# yalnızca işler (bir kısmı) başka süreçlerde yürüyorsa gerekir
+METRICS_RESEED = 15.0
+
+class JobSignal:
+    """Süreç içi iş bildirimi ve zamanlayıcı yığını.
+
+    İş ekleyen kod `notify()` çağırır ve bekleyen worker'lar hemen uyanır;
+    ileri tarihli işler (retry backoff, işlem süresi aşımı) `next_run_at`
+    anahtarlı bir min-heap'te tutulur ve worker'lar tam o ana kadar uyur.
+    Bildirim event bus ile diğer süreçlerin worker'larına da iletilir.
+    """
+
+    def __init__(self) -> None:
+        self._event: Optional[asyncio.Event] = None
+        self._timers: list[datetime] = []
+
+    def waiter(self) -> asyncio.Event:
+        # iş aramadan ÖNCE alınmalı; aksi halde arada gelen bildirim kaçar
+        if self._event is None:
+            self._event = asyncio.Event()
+        return self._event
+
+    def schedule(self, at: datetime) -> None:
+        if at > datetime.utcnow() and not (self._timers and self._timers[0] == at):
+            heapq.heappush(self._timers, at)
+
+    def notify(self, at: Optional[datetime] = None) -> None:
+        self._wake(at)
+        event_bus.publish("_jobs", dumps({"at": at}))
+
+    def on_remote_event(self, kind: str, text: str) -> None:
+        if kind == "_jobs":
+            at = json.loads(text)["at"]
+            self._wake(datetime.fromisoformat(at) if at else None)
+
+    def _wake(self, at: Optional[datetime]) -> None:
+        if at is not None:
+            self.schedule(at)
+        ev, self._event = self._event, None
+        if ev is not None:
+            ev.set()
+
+    def timeout(self, max_wait: float) -> float:
+        now = datetime.utcnow()
+        while self._timers and self._timers[0] <= now:
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return max_wait
+        return min(max_wait, (self._timers[0] - now).total_seconds())
+
+job_signal = JobSignal()
 
 class PushRunner:
-    def __init__(self, session_factory, emulator: EmulatorService):
+    def __init__(self, session_factory, emulator: EmulatorService, workers: int = PUSH_WORKERS,
+                 worker_id: str = WORKER_ID):
         self.session_factory = session_factory
         self.emulator = emulator
-        self._task: Optional[asyncio.Task] = None
-        self._durations: list[int] = []
+        self.workers = max(1, workers)
+        self.worker_id = worker_id
+        self._tasks: list[asyncio.Task] = []
+        self._process_jobs = True
+        self._claim_lock = asyncio.Lock()
+        # ACK süreleri: son 60 sn'lik kayan pencere, mağaza bazında
+        self.ack_latency = KeyedLatency(window_s=60.0)
+        # zamanlanmış fiyatın etikete inmesindeki sapma (ACK anı - scheduled_at)
+        self.flip_drift = KeyedLatency(window_s=60.0)
 
-    async def start(self):
-        if not self._task:
-            self._task = asyncio.create_task(self._run())
+    async def start(self, process_jobs: bool = True):
+        """Metrik yayınını ve (process_jobs ise) iş worker'larını başlatır.
 
-    async def _run(self):
+        process_jobs=False, işleri ayrı worker süreçlerine bırakan web süreçleri
+        içindir; metrikler yine periyodik yeniden sayımla güncel kalır.
+        Paylaşımlı bus'ta metrikleri yalnızca hub süreci yayınlar; hub
+        değişirse yayın kendiliğinden yeni hub'a geçer.
+        """
+        if not self._tasks:
+            self._process_jobs = process_jobs
+            async with self.session_factory() as session:
+                await push_metrics.seed(session)
+            if process_jobs:
+                self._tasks = [asyncio.create_task(self._run(wid)) for wid in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._metrics_loop()))
+
+    async def _run(self, wid: int):
+        # her worker kendi session'ı ile çalışır
         while True:
             async with self.session_factory() as session:
-                now = datetime.utcnow()
-                q = (select(PushJob)
-                     .where(
-                        (PushJob.status.in_(["QUEUED"])) |
-                        ((PushJob.status == "PROCESSING") & (PushJob.next_run_at <= now)) |
-                        ((PushJob.status == "QUEUED") & ((PushJob.next_run_at == None) | (PushJob.next_run_at <= now)))
-                     )
-                     .order_by(PushJob.updated_at)
-                     .limit(1))
-                job = (await session.execute(q)).scalar_one_or_none()
-
-                if not job:
-                    await self._broadcast_metrics(session)
-                    await asyncio.sleep(0.4)
-                    continue
-
-                job.status = "PROCESSING"
-                job.updated_at = now
-                await session.commit()
-
-                # ilgili kayıtları çek
-                req = (await session.execute(select(PriceChangeRequest).where(PriceChangeRequest.id == job.request_id))).scalar_one()
-                prod = (await session.execute(select(Product).where(Product.id == req.product_id))).scalar_one()
-                label = (await session.execute(select(ShelfLabel).where(ShelfLabel.id == job.label_id))).scalar_one()
-
-                start = datetime.utcnow()
-                ok = await self.emulator.set_price(session, label.id, prod.sku, float(req.new_price))
-                dur_ms = int((datetime.utcnow() - start).total_seconds() * 1000)
-                self._durations.append(dur_ms)
-
-                if ok:
-                    job.status = "SUCCESS"
-                    job.updated_at = datetime.utcnow()
-                    await session.commit()  # job SUCCESS
-
-                    # === TÜM JOB'LAR TAMAMLANDI MI? ===
-                    remaining_q = select(PushJob).where(
-                        (PushJob.request_id == req.id) & (PushJob.status != "SUCCESS")
-                    )
-                    remaining = (await session.execute(remaining_q)).scalars().all()
-
-                    if not remaining:
-                        # eski fiyat talepte kilitlendiyse onu kullan, yoksa mevcut base_price
-                        old_price = req.old_price if getattr(req, "old_price", None) is not None else prod.base_price
-                        new_price = float(req.new_price)
-
-                        if prod.base_price != new_price:
-                            # 1) ürüne yeni fiyatı uygula
-                            prod.base_price = new_price
-                            # 2) price history kaydı
-                            hist = PriceHistory(
-                                product_id=prod.id,
-                                store=req.store,
-                                old_price=old_price,
-                                new_price=new_price,
-                                source_request_id=req.id,
-                                changed_by="system/push",
-                            )
-                            session.add(hist)
-
-                        # (opsiyonel) request'i tamamlandı işaretle
+                try:
+                    wake = job_signal.waiter()
+                    start = time.perf_counter()
+                    jobs = await self._claim(session)
+                    push_claim.observe(time.perf_counter() - start)
+
+                    if not jobs:
+                        # sıradaki vadeyi (başka süreçlerin işleri dahil) bir kez öğren, sonra uyu
+                        due = (await session.execute(
+                            select(func.min(PushJob.next_run_at))
+                            .where(PushJob.status.in_(["QUEUED", "PROCESSING"]))
+                        )).scalar_one_or_none()
+                        if due is not None:
+                            if due <= datetime.utcnow():
+                                continue
+                            job_signal.schedule(due)
+                        await session.close()
                         try:
-                            req.status = "COMPLETED"
-                            if hasattr(req, "updated_at"):
-                                req.updated_at = datetime.utcnow()
-                            if hasattr(req, "applied_at"):
-                                req.applied_at = datetime.utcnow()
-                        except Exception:
+                            await asyncio.wait_for(wake.wait(), job_signal.timeout(PUSH_IDLE_MAX))
+                        except asyncio.TimeoutError:
                             pass
+                        continue
 
-                        await session.commit()
+                    with profile(f"push worker={wid} jobs={len(jobs)}"):
+                        await self._process(session, jobs)
+                except Exception:
+                    # worker ölmesin: turu geri al, kısa bekle, yeniden dene;
+                    # yarıda kalan işler kira bitince yeniden sahiplenilir
+                    await session.rollback()
+                    log.exception("push worker %s failed, retrying", wid)
+                    await asyncio.sleep(PUSH_ERROR_BACKOFF)
 
-                        # UI'ya canlı bildirim (LabelWall dinliyor)
-                        try:
-                            await manager.broadcast_json({
-                                "type": "product-updated",
-                                "product": {
-                                    "id": prod.id,
-                                    "name": prod.name,
-                                    "price": prod.base_price,
-                                    "currency": getattr(prod, "currency", "TRY"),
-                                },
-                            })
-                        except Exception:
-                            pass
+    async def _metrics_loop(self):
+        # sayaçlar O(1); yayın iş başına değil sabit aralıkla yapılır
+        last_seed = time.monotonic()
+        while True:
+            # tüm işler bu süreçte yürüyorsa artımlı sayaçlar zaten doğru
+            out_of_process = event_bus.shared or not self._process_jobs
+            if out_of_process and time.monotonic() - last_seed >= METRICS_RESEED:
+                try:
+                    async with self.session_factory() as session:
+                        await push_metrics.seed(session)
+                except Exception:
+                    pass
+                last_seed = time.monotonic()
+            # paylaşımlı bus'ta her süreç yayınlarsa panel süreçler arasında
+            # gidip gelir; sayaçları yalnızca hub olan süreç yayınlar
+            if event_bus.is_hub:
+                await self._broadcast_metrics()
+            await asyncio.sleep(METRICS_INTERVAL)
+
+    def _due(self, now: datetime):
+        return (
+            ((PushJob.status == "PROCESSING") & (func.coalesce(PushJob.lease_expires_at, PushJob.next_run_at) <= now)) |
+            ((PushJob.status == "QUEUED") & ((PushJob.next_run_at == None) | (PushJob.next_run_at <= now)))
+        )
+
+    async def _claim(self, session: AsyncSession) -> list[PushJob]:
+        """Vadesi gelmiş işlerden tek mağazaya ait bir grubu kiralar.
 
+        En eski işin mağazası seçilir ve o mağazadan gateway çerçeve boyu kadar
+        iş alınır. Sahiplenme, vade koşulunu yeniden değerlendiren tek bir
+        UPDATE ... RETURNING ile atomiktir ve işe bu sürecin kimliğini ve kira
+        bitişini yazar; süreçler arası da aynı iş iki kez alınmaz. Kirası dolmuş
+        PROCESSING işler (sahibi çöktü/takıldı) vadesi gelmiş sayılır.
+        """
+        async with self._claim_lock:
+            now = datetime.utcnow()
+            store = (await session.execute(
+                select(ShelfLabel.store)
+                .join(PushJob, PushJob.label_id == ShelfLabel.id)
+                .where(self._due(now))
+                .order_by(PushJob.updated_at)
+                .limit(1)
+            )).scalar_one_or_none()
+            if store is None:
+                return []
+
+            gw = self.emulator.gateway(store)
+            candidates = (await session.execute(
+                select(PushJob.id, PushJob.status)
+                .join(ShelfLabel, ShelfLabel.id == PushJob.label_id)
+                .where(self._due(now), ShelfLabel.store == store)
+                .order_by(PushJob.updated_at)
+                .limit(gw.frame_size)
+            )).all()
+            old_status = {job_id: status for job_id, status in candidates}
+
+            # kira, aynı gateway kilidini bekleyebilecek diğer worker'ların döngülerini de kapsar
+            deadline = now + PROCESSING_TIMEOUT + timedelta(seconds=gw.cycle_time * (self.workers + 1))
+            claimed = (await session.execute(
+                update(PushJob)
+                .where(PushJob.id.in_(list(old_status)), self._due(now))
+                .values(status="PROCESSING", updated_at=now, next_run_at=deadline,
+                        lease_owner=self.worker_id, lease_expires_at=deadline)
+                .returning(PushJob.id)
+                .execution_options(synchronize_session=False)
+            )).scalars().all()
+            await session.commit()
+            if not claimed:
+                return []
+
+            for job_id in claimed:
+                push_metrics.moved(old_status[job_id], "PROCESSING")
+            push_claimed.inc(store, n=len(claimed))
+            reclaimed = sum(1 for job_id in claimed if old_status[job_id] == "PROCESSING")
+            if reclaimed:
+                push_results.inc(store, "reclaimed", n=reclaimed)
+            job_signal.schedule(deadline)
+            return (await session.execute(
+                select(PushJob).where(PushJob.id.in_(claimed)).execution_options(populate_existing=True)
+            )).scalars().all()
+
+    async def _process(self, session: AsyncSession, jobs: list[PushJob]):
+        # ilgili kayıtları toplu çek
+        req_ids = {j.request_id for j in jobs}
+        reqs = {r.id: r for r in (await session.execute(
+            select(PriceChangeRequest).where(PriceChangeRequest.id.in_(req_ids))
+        )).scalars()}
+        prods = {p.id: p for p in (await session.execute(
+            select(Product).where(Product.id.in_({r.product_id for r in reqs.values()}))
+        )).scalars()}
+
+        # aynı (ürün, mağaza) için daha yeni onaylı fiyat varsa bu işleri gönderme
+        store = reqs[jobs[0].request_id].store
+        stale = await self._superseded(session, list(reqs.values()))
+        if stale:
+            n = len(jobs)
+            jobs = await self._cancel_superseded(session, jobs, stale)
+            push_results.inc(store, "cancelled", n=n - len(jobs))
+            if not jobs:
+                return
+
+        batch = []
+        for j in jobs:
+            req = reqs[j.request_id]
+            batch.append((j.label_id, prods[req.product_id].sku, float(req.new_price)))
+        # etiket sağlığı emülatörde write-behind tampona yazılır
+        start = time.perf_counter()
+        results = await self.emulator.set_prices(store, batch)
+        push_dispatch.observe(time.perf_counter() - start, store)
+
+        # sonuçları yalnızca kirası hâlâ bizde olan işlere yaz; bu UPDATE yazma
+        # kilidini alır, kontrol ve sonuç aynı transaction'da kalır
+        owned = set((await session.execute(
+            update(PushJob)
+            .where(PushJob.id.in_([j.id for j in jobs]),
+                   PushJob.lease_owner == self.worker_id,
+                   PushJob.status == "PROCESSING")
+            .values(lease_owner=None, lease_expires_at=None)
+            .returning(PushJob.id)
+            .execution_options(synchronize_session=False)
+        )).scalars())
+        if len(owned) < len(jobs):
+            for j in jobs:
+                if j.id not in owned:
+                    session.expunge(j)
+            push_results.inc(store, "lease_lost", n=len(jobs) - len(owned))
+
+        now = datetime.utcnow()
+        moved: dict[str, int] = {}
+        deltas: dict[str, dict[str, int]] = {}
+        retry_at: Optional[datetime] = None
+        for job, (ok, ack_ms) in zip(jobs, results):
+            if job.id not in owned:
+                continue
+            self.ack_latency.record(store, ack_ms)
+            push_ack.observe(ack_ms / 1000, store)
+            job.updated_at = now
+            d = deltas.setdefault(job.request_id, {"success": 0, "failed": 0})
+            if ok:
+                job.status = "SUCCESS"
+                d["success"] += 1
+                push_results.inc(store, "success")
+                sched = reqs[job.request_id].scheduled_at
+                if sched:
+                    drift_ms = max(0, int((now - sched).total_seconds() * 1000))
+                    self.flip_drift.record(store, drift_ms)
+            else:
+                job.try_count += 1
+                if job.try_count >= MAX_RETRY:
+                    job.status = "FAILED"
+                    job.last_error = "Emulator NACK"
+                    d["failed"] += 1
+                    push_results.inc(store, "failed")
                 else:
-                    job.try_count += 1
-                    if job.try_count >= MAX_RETRY:
-                        job.status = "FAILED"
-                        job.updated_at = datetime.utcnow()
-                        job.last_error = "Emulator NACK"
-                        await session.commit()
-                    else:
-                        delay = 2 ** job.try_count
-                        job.status = "QUEUED"
-                        job.next_run_at = datetime.utcnow() + timedelta(seconds=delay)
-                        job.updated_at = datetime.utcnow()
-                        await session.commit()
-
-                await self._broadcast_metrics(session)
-
-    async def _broadcast_metrics(self, session: AsyncSession):
-        total = (await session.execute(select(PushJob))).scalars().all()
-        success = sum(1 for j in total if j.status == "SUCCESS")
-        failed = sum(1 for j in total if j.status == "FAILED")
-        queued = sum(1 for j in total if j.status == "QUEUED")
-        processing = sum(1 for j in total if j.status == "PROCESSING")
-        avg_ack_ms = int(mean(self._durations)) if self._durations else None
+                    push_results.inc(store, "retry")
+                    delay = 2 ** job.try_count
+                    job.status = "QUEUED"
+                    job.next_run_at = now + timedelta(seconds=delay)
+                    retry_at = min(retry_at or job.next_run_at, job.next_run_at)
+            moved[job.status] = moved.get(job.status, 0) + 1
+        # talep sayaçları iş durumlarıyla aynı transaction'da güncellenir
+        progress = [p for p in [await add_progress(session, rid, **d) for rid, d in deltas.items()] if p]
+        await session.commit()
+        for status, n in moved.items():
+            push_metrics.moved("PROCESSING", status, n)
+        if retry_at:
+            job_signal.notify(retry_at)
+        await self._report_progress(session, progress, reqs, prods)
+
+    async def _report_progress(self, session: AsyncSession, progress: list[dict], reqs: dict, prods: dict):
+        for p in progress:
+            try:
+                await manager.broadcast_json({"type": "push-progress", **p})
+            except Exception:
+                pass
+            # === TÜM JOB'LAR TAMAMLANDI MI? === (sayaçtan, O(1))
+            if p["pending"] == 0 and p["success"] == p["total"] and p["request_id"] in reqs:
+                req = reqs[p["request_id"]]
+                await self._complete_request(session, req, prods[req.product_id])
+
+    async def _superseded(self, session: AsyncSession, reqs: list[PriceChangeRequest]) -> set[str]:
+        stale = {r.id for r in reqs if r.status == "SUPERSEDED"}
+        now = datetime.utcnow()
+        # en yeni fiyat yürürlük anına göre seçilir; sonradan oluşturulmuş ama daha
+        # önce yürürlüğe girmiş bir talep, vakti gelen zamanlanmış fiyatı geçersiz kılmaz
+        newest = dict(((pid, store), eff) for pid, store, eff in await session.execute(
+            select(PriceChangeRequest.product_id, PriceChangeRequest.store, func.max(EFFECTIVE_AT))
+            .where(PriceChangeRequest.product_id.in_({r.product_id for r in reqs}),
+                   PriceChangeRequest.store.in_({r.store for r in reqs}),
+                   PriceChangeRequest.status.in_(["APPROVED", "COMPLETED"]),
+                   # ileri tarihli (zamanlanmış) fiyatlar bugünkünü geçersiz kılmaz
+                   (PriceChangeRequest.scheduled_at == None) | (PriceChangeRequest.scheduled_at <= now))
+            .group_by(PriceChangeRequest.product_id, PriceChangeRequest.store)
+        ))
+        for r in reqs:
+            latest = newest.get((r.product_id, r.store))
+            if latest is not None and latest > effective_at(r):
+                stale.add(r.id)
+        return stale
+
+    async def _cancel_superseded(self, session: AsyncSession, jobs: list[PushJob], stale: set[str]) -> list[PushJob]:
+        now = datetime.utcnow()
+        await session.execute(
+            update(PriceChangeRequest)
+            .where(PriceChangeRequest.id.in_(stale), PriceChangeRequest.status == "APPROVED")
+            .values(status="SUPERSEDED")
+            .execution_options(synchronize_session=False)
+        )
+        keep, per_request = [], {}
+        for job in jobs:
+            if job.request_id in stale:
+                job.status = "CANCELLED"
+                job.last_error = "superseded"
+                job.updated_at = now
+                per_request[job.request_id] = per_request.get(job.request_id, 0) + 1
+            else:
+                keep.append(job)
+        progress = [await add_progress(session, rid, cancelled=n) for rid, n in per_request.items()]
+        await session.commit()
+        push_metrics.moved("PROCESSING", "CANCELLED", sum(per_request.values()))
+        for p in progress:
+            if p:
+                await manager.broadcast_json({"type": "push-progress", **p})
+        return keep
+
+    async def _complete_request(self, session: AsyncSession, req: PriceChangeRequest, prod: Product):
+        # son iki job'ı aynı anda bitiren iki worker'dan yalnızca biri tamamlasın;
+        # bu arada daha yeni fiyatla geçersiz kalmışsa eski fiyat uygulanmaz
+        res = await session.execute(
+            update(PriceChangeRequest)
+            .where(PriceChangeRequest.id == req.id,
+                   PriceChangeRequest.status.notin_(["COMPLETED", "SUPERSEDED"]))
+            .values(status="COMPLETED")
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount != 1:
+            await session.rollback()
+            return
+        req.status = "COMPLETED"
+
+        # eski fiyat talepte kilitlendiyse onu kullan, yoksa mevcut base_price
+        old_price = req.old_price if getattr(req, "old_price", None) is not None else prod.base_price
+        new_price = float(req.new_price)
+
+        if prod.base_price != new_price:
+            # 1) ürüne yeni fiyatı uygula
+            prod.base_price = new_price
+            # 2) price history kaydı
+            changed_at = datetime.utcnow()
+            hist = PriceHistory(
+                product_id=prod.id,
+                store=req.store,
+                old_price=old_price,
+                new_price=new_price,
+                source_request_id=req.id,
+                changed_by="system/push",
+                changed_at=changed_at,
+            )
+            session.add(hist)
+            # 3) günlük özet, geçmiş kaydıyla aynı transaction'da
+            await price_rollup.record_change(session, prod.id, req.store, old_price, new_price, changed_at)
+
+        # (opsiyonel) request'i tamamlandı işaretle
+        try:
+            if hasattr(req, "updated_at"):
+                req.updated_at = datetime.utcnow()
+            if hasattr(req, "applied_at"):
+                req.applied_at = datetime.utcnow()
+        except Exception:
+            pass
+
+        await session.commit()
+        wall_cache.product_updated({"id": prod.id, "name": prod.name, "price": float(prod.base_price)})
+
+        # UI'ya canlı bildirim (LabelWall dinliyor)
+        try:
+            await manager.broadcast_json({
+                "type": "product-updated",
+                "product": {
+                    "id": prod.id,
+                    "name": prod.name,
+                    "price": prod.base_price,
+                    "currency": getattr(prod, "currency", "TRY"),
+                },
+            })
+        except Exception:
+            pass
+
+    async def _broadcast_metrics(self):
+        ack = self.ack_latency.summary()
         await manager.broadcast_json({
             "type": "metrics",
-            "total": len(total),
-            "success": success,
-            "failed": failed,
-            "queued": queued,
-            "processing": processing,
-            "avg_ack_ms": avg_ack_ms,
+            "source": self.worker_id,
+            **push_metrics.snapshot(),
+            "avg_ack_ms": ack["all"]["avg"],
+            "ack": ack["all"],
+            "stores": ack["by_key"],
+            "flip_drift": self.flip_drift.summary()["all"],
         })
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import asyncio, heapq, json, os
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from ..models import PriceChangeRequest
+from .metrics import push_metrics
+from .push_jobs import expand_requests, mark_no_labels, chunks
+from .push_runner import job_signal
+from . import change_log
+from .change_log import CHANGES_PRUNE_EVERY
+from .event_bus import event_bus
+from ..streaming import dumps
+
+# zamanlanmış talepler bu kadar önce PushJob'lara açılır; işler yine tam
+# scheduled_at anına vadelenir, böylece flip anında kuyruk hazırdır
+SCHEDULE_LEAD = float(os.getenv("SCHEDULE_LEAD", "60"))
+# onayı başka yoldan (başka süreç, geç commit) gelen talepler için DB'ye bakma aralığı, sn
+SCHEDULE_POLL = float(os.getenv("SCHEDULE_POLL", "5"))
+# açma hata verirse (ör. DB kilitli) talepler bu kadar sonra yeniden denenir, sn
+SCHEDULE_RETRY = 2.0
+
+class PriceScheduler:
+    """PriceChangeRequest.scheduled_at'i uygulayan zamanlayıcı.
+
+    Onaylı ve henüz açılmamış zamanlanmış talepler (açılma anı, id) anahtarlı
+    bir min-heap'te tutulur. Vakti gelen talepler toplu olarak PushJob'lara
+    açılır; PushRunner'ın zamanlayıcısı işleri tam scheduled_at'te uyandırır.
+    track() ile bildirilmeyen (ya da bildirildiğinde henüz commit edilmemiş)
+    talepler SCHEDULE_POLL aralığıyla veritabanından yeniden okunur. Hiç
+    etiketi olmayan talepler NO_LABELS olarak kapatılır. track() bildirimi
+    event bus ile diğer süreçlere de gider; zamanlayıcıyı çalıştırmayan
+    süreçler (PUSH_RUNNER=0) yalnızca iletir, kendileri bir şey tutmaz.
+    Aynı döngü değişiklik günlüğünün eski silme kayıtlarını da CHANGES_PRUNE_EVERY
+    aralığıyla budar.
+    """
+
+    def __init__(self, lead: float = SCHEDULE_LEAD) -> None:
+        self.lead = timedelta(seconds=lead)
+        self.session_factory = None
+        self._heap: list[tuple[datetime, str]] = []
+        self._queued: set[str] = set()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def upcoming(self) -> int:
+        return len(self._queued)
+
+    async def start(self, session_factory) -> None:
+        self.session_factory = session_factory
+        if self._task:
+            return
+        await self._poll(horizon=None)
+        self._task = asyncio.create_task(self._run())
+
+    async def _poll(self, horizon: Optional[timedelta] = None) -> None:
+        """Açılmayı bekleyen onaylı talepleri DB'den okuyup takibe alır.
+
+        `horizon` verilirse yalnızca o süre içinde açılacaklar okunur.
+        """
+        q = (select(PriceChangeRequest.id, PriceChangeRequest.scheduled_at)
+             .where(PriceChangeRequest.status == "APPROVED",
+                    PriceChangeRequest.scheduled_at != None,
+                    PriceChangeRequest.jobs_total == 0))
+        if horizon is not None:
+            q = q.where(PriceChangeRequest.scheduled_at <= datetime.utcnow() + self.lead + horizon)
+        async with self.session_factory() as session:
+            rows = (await session.execute(q)).all()
+        self._add(rows)
+
+    def track(self, reqs: Iterable) -> None:
+        """(id, scheduled_at) çiftlerini ya da talep nesnelerini takibe alır.
+
+        Onay commit edildikten sonra çağrılmalı.
+        """
+        items = [(r.id, r.scheduled_at) if hasattr(r, "scheduled_at") else tuple(r) for r in reqs]
+        items = [(req_id, at) for req_id, at in items if at is not None]
+        if not items:
+            return
+        # worker süreçlerinin zamanlayıcısı beklemeden (SCHEDULE_POLL) öğrensin
+        event_bus.publish("_schedule", dumps(items))
+        self._add(items)
+
+    def on_remote_event(self, kind: str, text: str) -> None:
+        if kind == "_schedule":
+            self._add([(req_id, datetime.fromisoformat(at)) for req_id, at in json.loads(text)])
+
+    def _add(self, items: Iterable[tuple[str, datetime]]) -> None:
+        if self.session_factory is None:
+            return  # bu süreçte zamanlayıcı çalışmıyor
+        added = False
+        for req_id, at in items:
+            if at is None or req_id in self._queued:
+                continue
+            heapq.heappush(self._heap, (at - self.lead, req_id))
+            self._queued.add(req_id)
+            added = True
+        if added:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_poll = loop.time() + SCHEDULE_POLL
+        next_prune = loop.time() + CHANGES_PRUNE_EVERY
+        while True:
+            if loop.time() >= next_prune:
+                try:
+                    await self._prune()
+                except Exception:
+                    pass
+                next_prune = loop.time() + CHANGES_PRUNE_EVERY
+            if loop.time() >= next_poll:
+                try:
+                    await self._poll(horizon=timedelta(seconds=SCHEDULE_POLL))
+                except Exception:
+                    pass
+                next_poll = loop.time() + SCHEDULE_POLL
+            now = datetime.utcnow()
+            due: list[str] = []
+            while self._heap and self._heap[0][0] <= now:
+                _, req_id = heapq.heappop(self._heap)
+                due.append(req_id)
+            if due:
+                try:
+                    await self._expand(due)
+                except Exception:
+                    # kaybetme: kısa süre sonra yeniden dene
+                    retry = now + timedelta(seconds=SCHEDULE_RETRY)
+                    for req_id in due:
+                        heapq.heappush(self._heap, (retry, req_id))
+                    continue
+                # açılmayanlar (ör. onay henüz commit edilmemiş) bir sonraki _poll'da geri gelir
+                self._queued.difference_update(due)
+                continue
+
+            timeout = max(0.0, min(next_poll, next_prune) - loop.time())
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _prune(self) -> None:
+        async with self.session_factory() as session:
+            await change_log.prune(await session.connection())
+            await session.commit()
+
+    async def _expand(self, req_ids: list[str]) -> None:
+        async with self.session_factory() as session:
+            for part in chunks(req_ids):
+                # onayı geri alınmış ya da elle başlatılmış talepleri atla
+                reqs = (await session.execute(
+                    select(PriceChangeRequest).where(
+                        PriceChangeRequest.id.in_(part),
+                        PriceChangeRequest.status == "APPROVED",
+                        PriceChangeRequest.jobs_total == 0,
+                    )
+                )).scalars().all()
+                if not reqs:
+                    continue
+                try:
+                    counts = await expand_requests(session, reqs)
+                    await mark_no_labels(session, [rid for rid, n in counts.items() if not n])
+                    await session.commit()
+                except IntegrityError:
+                    await session.rollback()
+                    continue
+                push_metrics.added("QUEUED", sum(counts.values()))
+                job_signal.notify(min(r.scheduled_at for r in reqs))
+
+price_scheduler = PriceScheduler()
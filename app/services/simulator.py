@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio, time
+from typing import Optional
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from .push_runner import PUSH_WORKERS
+
+# fiyat kuralını tüm (ürün, mağaza, etiket) üzerinde tek vektörel geçişte
+# değerlendirmek için katalog sıkıştırılmış dizilere yüklenir ve önbelleklenir
+LOAD_CHUNK = 50_000
+
+
+class CatalogArrays:
+    """Ürün fiyatları ve etiket atamalarının NumPy gösterimi.
+
+    `price[i]` i. ürünün fiyatı; her atama için `a_prod[k]`, `a_store[k]`
+    ürün ve mağaza indeksleridir (bir etiket = bir atama satırı).
+    """
+
+    def __init__(self, product_ids: list[str], price: np.ndarray, stores: list[str],
+                 a_prod: np.ndarray, a_store: np.ndarray, fingerprint: tuple) -> None:
+        self.product_ids = product_ids
+        self.product_index = {pid: i for i, pid in enumerate(product_ids)}
+        self.price = price
+        self.stores = stores
+        self.store_index = {s: i for i, s in enumerate(stores)}
+        self.a_prod = a_prod
+        self.a_store = a_store
+        self.fingerprint = fingerprint
+
+
+async def _fingerprint(session: AsyncSession) -> tuple:
+    # değişiklik algısı: ürün ve atama satır sürümleri ile silme kayıtları (indeksli max'lar).
+    # Etiketin mağaza değişimi atamalarının sürümünü ilerletir (bkz. change_log);
+    # push işleri ve etiket telemetrisi diziyi etkilemediğinden anahtara girmez.
+    p = (await session.execute(select(func.max(models.Product.row_version)))).scalar()
+    a = (await session.execute(select(func.max(models.LabelAssignment.row_version)))).scalar()
+    d = (await session.execute(
+        select(func.max(models.ChangeTombstone.version))
+        .where(models.ChangeTombstone.tbl.in_(("product", "label_assignment")))
+    )).scalar()
+    return (p, a, d)
+
+async def _load(session: AsyncSession, fingerprint: tuple) -> CatalogArrays:
+    product_ids: list[str] = []
+    prices: list[float] = []
+    for pid, price in await session.execute(select(models.Product.id, models.Product.base_price)):
+        product_ids.append(pid)
+        prices.append(float(price))
+    pindex = {pid: i for i, pid in enumerate(product_ids)}
+
+    stores: dict[str, int] = {}
+    prod_parts, store_parts = [], []
+    res = await session.stream(
+        select(models.LabelAssignment.product_id, models.ShelfLabel.store)
+        .join(models.ShelfLabel, models.ShelfLabel.id == models.LabelAssignment.label_id)
+        .execution_options(yield_per=LOAD_CHUNK)
+    )
+    async for rows in res.partitions():
+        prod_parts.append(np.fromiter((pindex[r[0]] for r in rows), dtype=np.int32, count=len(rows)))
+        store_parts.append(np.fromiter((stores.setdefault(r[1], len(stores)) for r in rows),
+                                       dtype=np.int32, count=len(rows)))
+    empty = np.empty(0, dtype=np.int32)
+    return CatalogArrays(
+        product_ids, np.asarray(prices, dtype=np.float64), list(stores),
+        np.concatenate(prod_parts) if prod_parts else empty,
+        np.concatenate(store_parts) if store_parts else empty,
+        fingerprint,
+    )
+
+
+class PriceSimulator:
+    def __init__(self) -> None:
+        self._arrays: Optional[CatalogArrays] = None
+        self._lock = asyncio.Lock()
+
+    async def arrays(self, session: AsyncSession) -> CatalogArrays:
+        fp = await _fingerprint(session)
+        if self._arrays is not None and self._arrays.fingerprint == fp:
+            return self._arrays
+        async with self._lock:
+            if self._arrays is None or self._arrays.fingerprint != fp:
+                self._arrays = await _load(session, fp)
+        return self._arrays
+
+    def invalidate(self) -> None:
+        self._arrays = None
+
+    @staticmethod
+    def apply_rule(price: np.ndarray, percent: Optional[float] = None, round_99: bool = False,
+                   floor: Optional[float] = None, ceiling: Optional[float] = None) -> np.ndarray:
+        new = price * (1 + percent / 100) if percent else price.copy()
+        if round_99:
+            # x.99'a yukarı yuvarla (10.20 -> 10.99, 11.00 -> 10.99)
+            new = np.ceil(np.round(new, 2)) - 0.01
+        if floor is not None or ceiling is not None:
+            new = np.clip(new, floor, ceiling)
+        return np.maximum(np.round(new, 2), 0.01)
+
+    async def simulate(self, session: AsyncSession, rule, gateways) -> dict:
+        t0 = time.perf_counter()
+        cat = await self.arrays(session)
+        t_load = time.perf_counter()
+
+        new = self.apply_rule(cat.price, rule.percent, rule.round_99, rule.floor, rule.ceiling)
+        changed = np.abs(new - cat.price) >= 0.005
+        if rule.product_ids is not None:
+            selected = np.zeros(len(cat.price), dtype=bool)
+            idx = [cat.product_index[p] for p in rule.product_ids if p in cat.product_index]
+            selected[idx] = True
+            changed &= selected
+
+        mask = changed[cat.a_prod]
+        if rule.stores is not None:
+            store_sel = np.zeros(len(cat.stores), dtype=bool)
+            store_sel[[cat.store_index[s] for s in rule.stores if s in cat.store_index]] = True
+            mask &= store_sel[cat.a_store]
+
+        prod_hit = cat.a_prod[mask]
+        store_hit = cat.a_store[mask]
+        labels = int(mask.sum())
+        # talep = etkilenen (ürün, mağaza) çifti
+        requests = int(np.unique(prod_hit.astype(np.int64) * max(1, len(cat.stores)) + store_hit).size)
+
+        # gelir ağırlığı: fiyat x etiket sayısı (satış verisi yok; raf yüzü vekil)
+        old_sum = float(cat.price[prod_hit].sum())
+        new_sum = float(new[prod_hit].sum())
+        weighted_delta_pct = round((new_sum - old_sum) / old_sum * 100, 3) if old_sum else 0.0
+
+        # süre: mağazalar paralel, her biri kendi gateway hızında; en fazla PUSH_WORKERS eşzamanlı
+        per_store = np.bincount(store_hit, minlength=len(cat.stores))
+        throughput = np.array([gateways(s).throughput for s in cat.stores], dtype=np.float64)
+        store_secs = np.divide(per_store, throughput, out=np.zeros(len(cat.stores)), where=throughput > 0)
+        est = max(float(store_secs.max(initial=0.0)), float(store_secs.sum()) / max(1, PUSH_WORKERS))
+        top = np.argsort(-store_secs)[:10]
+
+        return {
+            "products_changed": int(changed.sum()),
+            "requests": requests,
+            "labels": labels,
+            "revenue_weighted_delta_pct": weighted_delta_pct,
+            "avg_price_delta": round((new_sum - old_sum) / labels, 4) if labels else 0.0,
+            "estimated_push_seconds": round(est, 1),
+            "stores": [{"store": cat.stores[i], "labels": int(per_store[i]),
+                        "seconds": round(float(store_secs[i]), 1)} for i in top if per_store[i]],
+            "assignments": int(cat.a_prod.size),
+            "timing_ms": {"load": round((t_load - t0) * 1000, 1),
+                          "eval": round((time.perf_counter() - t_load) * 1000, 1)},
+        }
+
+price_simulator = PriceSimulator()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import logging, os, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+# SQL_PROFILE=1 ile engine'e cursor olayları bağlanır; kapalıyken hiçbir
+# dinleyici yoktur ve profile() yalnızca bir bayrak kontrolüdür
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0").lower() in ("1", "true", "yes")
+# bu kadar toplam DB süresini aşan istek/iş loglanır (ms)
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "100"))
+# aynı ifade bir kapsamda bu kadar kez tekrarlanırsa N+1 sayılır
+SQL_NPLUS1 = int(os.getenv("SQL_NPLUS1", "5"))
+SLOWEST_KEEP = 3
+
+log = logging.getLogger("esl.sql")
+
+class QueryStats:
+    """Bir HTTP isteği ya da push batch'i boyunca çalışan SQL ifadelerinin özeti."""
+
+    __slots__ = ("name", "count", "total_ms", "statements", "slowest")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: dict[str, int] = {}
+        self.slowest: list[tuple[float, str]] = []
+
+    def add(self, statement: str, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if len(self.slowest) < SLOWEST_KEEP or ms > self.slowest[-1][0]:
+            self.slowest.append((ms, statement))
+            self.slowest.sort(key=lambda x: -x[0])
+            del self.slowest[SLOWEST_KEEP:]
+
+    def repeated(self, threshold: int = SQL_NPLUS1) -> list[tuple[str, int]]:
+        return sorted(((s, n) for s, n in self.statements.items() if n >= threshold), key=lambda x: -x[1])
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "queries": self.count,
+            "db_ms": round(self.total_ms, 2),
+            "slowest": [{"ms": round(ms, 2), "sql": _short(s)} for ms, s in self.slowest],
+            "repeated": [{"n": n, "sql": _short(s)} for s, n in self.repeated()],
+        }
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_profile", default=None)
+
+def _short(statement: str, limit: int = 200) -> str:
+    s = " ".join(statement.split())
+    return s if len(s) <= limit else s[:limit] + "…"
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("_sqlp_start", []).append(time.perf_counter())
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("_sqlp_start")
+    if starts:
+        stats.add(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+def install(engine) -> None:
+    """Profil açıksa engine'in cursor olaylarını dinler."""
+    if not SQL_PROFILE:
+        return
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before):
+        event.listen(sync_engine, "before_cursor_execute", _before)
+        event.listen(sync_engine, "after_cursor_execute", _after)
+
+@contextmanager
+def profile(name: str):
+    """Kapsam içindeki SQL ifadelerini sayar; eşik aşılırsa ya da N+1 varsa loglar.
+
+    Profil kapalıyken None verir. Ad kapsam içinde `stats.name` ile
+    güncellenebilir (ör. route şablonu istek işlendikten sonra bilinir).
+    """
+    if not SQL_PROFILE:
+        yield None
+        return
+    stats = QueryStats(name)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        if stats.total_ms >= SQL_SLOW_MS or stats.repeated():
+            log.warning("sql profile %s", stats.summary())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import json, os
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from ..streaming import dumps
+
+# süreç yeniden başlarsa eski ETag'ler yanlışlıkla eşleşmesin
+_BOOT = os.urandom(4).hex()
+
+
+class WallCache:
+    """/labels/wall için süreç içi, sürümlü önbellek.
+
+    Mutasyon yolları (etiket oluştur/sil, atama, push tamamlanması) önbelleği
+    yerinde yamalar ve sürümü artırır. GET istekleri sürümden türetilen ETag
+    ile 304 alabilir; filtresiz tam görünüm hazır JSON gövdesinden döner.
+    """
+
+    def __init__(self) -> None:
+        self.version = 1
+        self._rows: Optional[dict[str, list[dict]]] = None  # label_id -> kartlar
+        self._body: Optional[bytes] = None
+
+    def etag(self, variant: str = "") -> str:
+        return f'W/"wall-{_BOOT}-{self.version}-{variant}"'
+
+    def _bump(self) -> None:
+        self.version += 1
+        self._body = None
+
+    def invalidate(self) -> None:
+        self._rows = None
+        self._bump()
+
+    async def body(self, session: AsyncSession) -> bytes:
+        if self._body is not None:
+            return self._body
+        version = self.version
+        if self._rows is None:
+            q = (
+                select(models.ShelfLabel, models.Product)
+                .join(models.LabelAssignment, models.LabelAssignment.label_id == models.ShelfLabel.id, isouter=True)
+                .join(models.Product, models.Product.id == models.LabelAssignment.product_id, isouter=True)
+            )
+            rows: dict[str, list[dict]] = {}
+            for lbl, prod in (await session.execute(q)).all():
+                rows.setdefault(lbl.id, []).append({
+                    "label": _label_dict(lbl),
+                    "product": None if prod is None else _product_dict(prod),
+                })
+            if version != self.version:
+                # okuma sırasında değişiklik oldu; bu sonucu önbelleğe alma
+                return dumps([c for cards in rows.values() for c in cards]).encode()
+            self._rows = rows
+        body = dumps([c for cards in self._rows.values() for c in cards]).encode()
+        if version == self.version:
+            self._body = body
+        return body
+
+    # ---- yerinde yamalar ----
+    def label_created(self, label: dict) -> None:
+        if self._rows is not None:
+            self._rows[label["id"]] = [{"label": dict(label), "product": None}]
+        self._bump()
+
+    def label_deleted(self, label_id: str) -> None:
+        if self._rows is not None:
+            self._rows.pop(label_id, None)
+        self._bump()
+
+    def label_assigned(self, label_id: str, product: dict) -> None:
+        if self._rows is not None:
+            cards = self._rows.get(label_id)
+            if cards is None:
+                self.invalidate()
+                return
+            if not any(c["product"] and c["product"]["id"] == product["id"] for c in cards):
+                if cards[0]["product"] is None:
+                    cards[0]["product"] = dict(product)
+                else:
+                    cards.append({"label": dict(cards[0]["label"]), "product": dict(product)})
+        self._bump()
+
+    def label_changed(self, label_id: str, **fields) -> None:
+        if self._rows is not None:
+            for c in self._rows.get(label_id, ()):
+                c["label"].update(fields)
+        self._bump()
+
+    def product_updated(self, product: dict) -> None:
+        if self._rows is not None:
+            for cards in self._rows.values():
+                for c in cards:
+                    if c["product"] and c["product"]["id"] == product["id"]:
+                        c["product"].update(product)
+        self._bump()
+
+    def on_remote_event(self, kind: str, text: str) -> None:
+        """Başka süreçteki değişikliği bu sürecin önbelleğine yansıtır."""
+        if kind == "product-updated":
+            p = json.loads(text)["product"]
+            self.product_updated({k: p[k] for k in ("id", "name", "price") if k in p})
+        elif kind == "_label-battery":
+            for lid, battery in json.loads(text)["labels"]:
+                self.label_changed(lid, battery_pct=battery)
+        elif kind in _WALL_EVENTS:
+            self.invalidate()
+
+# bu olaylar başka süreçte olduğunda önbellek yeniden kurulur
+_WALL_EVENTS = {"label-created", "label-deleted", "label-updated", "import-completed"}
+
+
+def _label_dict(lbl) -> dict:
+    return {
+        "id": lbl.id, "label_code": lbl.label_code, "store": lbl.store,
+        "battery_pct": lbl.battery_pct, "status": lbl.status
+    }
+
+def _product_dict(prod) -> dict:
+    return {
+        "id": prod.id, "name": prod.name,
+        "price": float(prod.base_price), "currency": prod.currency
+    }
+
+wall_cache = WallCache()
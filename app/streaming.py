@@ -0,0 +1,40 @@
+from __future__ import annotations
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Callable, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from .database import SessionLocal
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_CHUNK = 500
+
+def json_default(o):
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+def dumps(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=json_default)
+
+def wants_ndjson(request: Request, fmt: Optional[str]) -> bool:
+    if fmt:
+        return fmt == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def stream_rows(q, to_line: Callable, chunk: int = STREAM_CHUNK) -> AsyncIterator[bytes]:
+    """Sorguyu sunucu tarafı imleçle `chunk` satırlık parçalar halinde okur.
+
+    Yanıt gövdesi akarken istek bağımlılığının session'ı kapanmış olabilir;
+    bu yüzden akış kendi session'ını açar. Bellekte en fazla bir parça tutulur.
+    """
+    async with SessionLocal() as session:
+        result = await session.stream(q.execution_options(yield_per=chunk))
+        async for part in result.partitions(chunk):
+            yield "".join(dumps(to_line(row)) + "\n" for row in part).encode()
+
+def ndjson_response(body: AsyncIterator[bytes], headers: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE, headers=headers)
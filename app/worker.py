@@ -0,0 +1,52 @@
+"""Ayrı push worker süreci.
+
+    PUSH_RUNNER=0 uvicorn app.main:app --workers 4   # yalnızca API
+    python -m app.worker                            # bir ya da daha fazla worker
+
+İşler kira (lease) ile sahiplenildiğinden istenen sayıda worker süreci aynı
+veritabanı üzerinde birlikte çalışabilir.
+"""
+from __future__ import annotations
+import asyncio, signal
+
+from .database import init_db, SessionLocal
+from .services.emulator import EmulatorService
+from .services.push_runner import PushRunner, job_signal
+from .services.label_health import label_health
+from .services.scheduler import price_scheduler
+from .services.event_bus import event_bus
+from .routers.live import manager
+from .services.fanout import fanout_index
+
+
+async def main() -> None:
+    await init_db()
+    # worker'ın yayınları (ilerleme, metrik, ürün güncellemesi) web süreçlerine bus ile gider
+    manager.remote_hooks.append(job_signal.on_remote_event)
+    manager.remote_hooks.append(fanout_index.on_remote_event)
+    # API süreçlerindeki onaylar zamanlayıcıya bus ile gelir (yoksa SCHEDULE_POLL ile DB'den)
+    manager.remote_hooks.append(price_scheduler.on_remote_event)
+    await event_bus.start(manager.deliver_remote)
+    await label_health.start(SessionLocal)
+    await fanout_index.start(SessionLocal)
+    runner = PushRunner(SessionLocal, EmulatorService(success_rate=0.98))
+    await runner.start()
+    await price_scheduler.start(SessionLocal)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop.wait()
+    finally:
+        # bekleyen etiket telemetrisini kaybetme
+        await label_health.stop()
+        await event_bus.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
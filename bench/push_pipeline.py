@@ -0,0 +1,239 @@
+"""Push hattı için uçtan uca yük testi.
+
+Talep -> onay -> /push/{id}/start -> PushRunner -> EmulatorService zincirini
+gerçek FastAPI uygulaması üzerinden, süreç içinde (httpx ASGITransport) sürer
+ve sonuçları JSON olarak yazar:
+
+    python -m bench.push_pipeline --stores 5 --products 200 --labels-per 2
+    python -m bench.push_pipeline --out current.json --baseline baseline.json
+
+Her koşu geçici bir SQLite dosyası kullanır; esl.db'ye dokunulmaz.
+"""
+from __future__ import annotations
+import argparse, asyncio, json, os, resource, sys, tempfile, time
+from datetime import datetime
+
+
+def _parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="ESL push pipeline benchmark")
+    ap.add_argument("--stores", type=int, default=3)
+    ap.add_argument("--products", type=int, default=100)
+    ap.add_argument("--labels-per", type=int, default=1, help="(mağaza, ürün) başına etiket")
+    ap.add_argument("--requests", type=int, default=0, help="fiyat talebi sayısı, en fazla ürün x mağaza (0: hepsi)")
+    ap.add_argument("--concurrency", type=int, default=8, help="eşzamanlı HTTP istemcisi")
+    ap.add_argument("--cycle-time", type=float, default=0.0, help="emülatör radyo döngüsü, sn (0: gecikmesiz)")
+    ap.add_argument("--frame-size", type=int, default=32)
+    ap.add_argument("--success-rate", type=float, default=1.0)
+    ap.add_argument("--workers", type=int, default=4, help="PUSH_WORKERS")
+    ap.add_argument("--timeout", type=float, default=600.0, help="tüm taleplerin bitmesi için üst sınır, sn")
+    ap.add_argument("--out", help="sonuç JSON dosyası (verilmezse stdout)")
+    ap.add_argument("--baseline", help="karşılaştırılacak önceki sonuç JSON'u")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="izin verilen göreli kötüleşme")
+    return ap.parse_args(argv)
+
+
+def _configure_env(args) -> str:
+    # app modülleri ayarları import anında okur; önce ortamı hazırla
+    db_path = os.path.join(tempfile.mkdtemp(prefix="esl-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["PUSH_WORKERS"] = str(args.workers)
+    os.environ["ESL_FRAME_SIZE"] = str(args.frame_size)
+    os.environ["ESL_CYCLE_TIME"] = str(args.cycle_time)
+    os.environ.setdefault("LABEL_HEALTH_FLUSH", "0.5")
+    return db_path
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0, "avg": None, "p50": None, "p95": None, "p99": None, "max": None}
+    xs = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(xs[min(len(xs) - 1, int(p / 100 * len(xs)))], 2)
+
+    return {"count": len(xs), "avg": round(sum(xs) / len(xs), 2),
+            "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": round(xs[-1], 2)}
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'ta KB, macOS'ta bayt
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def _seed(SessionLocal, models, args) -> list[tuple[str, str]]:
+    from sqlalchemy import insert
+    stores = [f"S{s:03d}" for s in range(args.stores)]
+    products = [{"id": f"P{p:06d}", "sku": f"SKU{p:06d}", "name": f"Bench {p}",
+                 "base_price": 10 + p % 90, "currency": "TRY"} for p in range(args.products)]
+    labels, assignments = [], []
+    for store in stores:
+        for prod in products:
+            for k in range(args.labels_per):
+                lid = f"L-{store}-{prod['id']}-{k}"
+                labels.append({"id": lid, "label_code": lid, "store": store,
+                               "battery_pct": 95, "status": "ONLINE"})
+                assignments.append({"label_id": lid, "product_id": prod["id"]})
+    async with SessionLocal() as session:
+        for model, rows in ((models.Product, products), (models.ShelfLabel, labels),
+                            (models.LabelAssignment, assignments)):
+            for i in range(0, len(rows), 2000):
+                await session.execute(insert(model), rows[i:i + 2000])
+        await session.commit()
+    return [(p["id"], s) for p in products for s in stores]
+
+
+async def run(args) -> dict:
+    from sqlalchemy import event
+    import httpx
+    from app import main, models
+    from app.database import SessionLocal, engine
+    from app.routers.live import manager
+
+    main.emulator.success_rate = args.success_rate
+
+    sql = {"count": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(*_):
+        sql["count"] += 1
+
+    # talebin bittiği anı runner'ın push-progress yayınından yakala
+    started: dict[str, float] = {}
+    finished: dict[str, float] = {}
+    done = asyncio.Event()
+    expected = {"n": 0}
+    broadcast = manager.broadcast_json
+
+    async def _tap(data):
+        if data.get("type") == "push-progress" and data.get("pending") == 0:
+            rid = data["request_id"]
+            if rid in started and rid not in finished:
+                finished[rid] = time.perf_counter()
+                if len(finished) >= expected["n"]:
+                    done.set()
+        await broadcast(data)
+
+    manager.broadcast_json = _tap
+
+    # router.startup() yeni FastAPI sürümlerinde yok; uygulamanın kancalarını doğrudan çağır
+    await main._startup()
+    try:
+        pairs = await _seed(SessionLocal, models, args)
+        if args.requests:
+            # aynı (ürün, mağaza) için ikinci talep ilkini geçersiz kılar; tekrar etme
+            pairs = pairs[:args.requests]
+        sql_seed = sql["count"]
+
+        transport = httpx.ASGITransport(app=main.app)
+        sem = asyncio.Semaphore(max(1, args.concurrency))
+        http_ms: list[float] = []
+        errors: list[str] = []
+        jobs = {"n": 0}
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def call(method: str, url: str, **kw):
+                t = time.perf_counter()
+                r = await client.request(method, url, **kw)
+                http_ms.append((time.perf_counter() - t) * 1000)
+                if r.status_code >= 400:
+                    raise RuntimeError(f"{method} {url} -> {r.status_code} {r.text[:120]}")
+                return r.json()
+
+            async def one(i: int, product_id: str, store: str):
+                rid = f"bench-{i:07d}"
+                async with sem:
+                    try:
+                        await call("POST", "/price-changes/", json={
+                            "id": rid, "product_id": product_id, "store": store,
+                            "new_price": str(5 + i % 200), "reason": "bench"})
+                        await call("POST", f"/price-changes/{rid}/approve",
+                                   json={"approver": "bench", "decision": "APPROVE"})
+                        started[rid] = time.perf_counter()
+                        res = await call("POST", f"/push/{rid}/start")
+                        jobs["n"] += res.get("jobs", 0)
+                    except Exception as e:
+                        started.pop(rid, None)
+                        errors.append(str(e))
+
+            t0 = time.perf_counter()
+            expected["n"] = len(pairs)
+            await asyncio.gather(*(one(i, pid, store) for i, (pid, store) in enumerate(pairs)))
+            expected["n"] = len(started)
+            if len(finished) >= expected["n"]:
+                done.set()
+            timed_out = False
+            try:
+                await asyncio.wait_for(done.wait(), args.timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+            elapsed = time.perf_counter() - t0
+
+        flip_ms = [(finished[r] - started[r]) * 1000 for r in finished]
+        return {
+            "at": datetime.utcnow().isoformat(timespec="seconds"),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "tolerance")},
+            "requests": len(pairs),
+            "completed": len(finished),
+            "errors": len(errors),
+            "error_samples": errors[:5],
+            "timed_out": timed_out,
+            "jobs": jobs["n"],
+            "elapsed_s": round(elapsed, 3),
+            "jobs_per_s": round(jobs["n"] / elapsed, 2) if elapsed else None,
+            "flip_latency_ms": _percentiles(flip_ms),
+            "http_latency_ms": _percentiles(http_ms),
+            "sql": {"seed": sql_seed, "run": sql["count"] - sql_seed,
+                    "per_job": round((sql["count"] - sql_seed) / jobs["n"], 2) if jobs["n"] else None},
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+    finally:
+        manager.broadcast_json = broadcast
+        await main._shutdown()
+        await engine.dispose()
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Önceki koşuya göre `tolerance`'tan fazla kötüleşen ölçümleri döner."""
+    checks = [
+        ("jobs_per_s", result.get("jobs_per_s"), baseline.get("jobs_per_s"), True),
+        ("flip_latency_ms.p95", result["flip_latency_ms"]["p95"], baseline.get("flip_latency_ms", {}).get("p95"), False),
+        ("sql.per_job", result["sql"]["per_job"], baseline.get("sql", {}).get("per_job"), False),
+        ("peak_rss_mb", result.get("peak_rss_mb"), baseline.get("peak_rss_mb"), False),
+    ]
+    out = []
+    for name, cur, base, higher_is_better in checks:
+        if cur is None or not base:
+            continue
+        change = (cur - base) / base
+        if (-change if higher_is_better else change) > tolerance:
+            out.append(f"{name}: {base} -> {cur} ({change:+.0%})")
+    return out
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    _configure_env(args)
+    result = asyncio.run(run(args))
+
+    code = 0
+    if result["errors"] or result["timed_out"]:
+        code = 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+        if regressions:
+            code = 1
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
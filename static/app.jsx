@@ -61,17 +61,44 @@ const priceParts = (val) => {
   return [intPart, decPart ?? "00"];
 };
 
+// /live/ws: kopunca yeniden bağlanır, son görülen seq ile kaçırılan olayları ister.
+// Sunucu tekrar oynatamazsa (süreç değişti / çok geride) onResync çağrılır.
+function liveSocket(onMessage, { onOpen, onResync } = {}) {
+  let ws = null, epoch = null, seq = null, closed = false, delay = 500, timer = null;
+  const connect = () => {
+    const qs = epoch && seq != null ? `?epoch=${encodeURIComponent(epoch)}&since=${seq}` : "";
+    ws = new WebSocket((location.protocol === "https:" ? "wss://" : "ws://") + location.host + "/live/ws" + qs);
+    ws.onopen = () => { delay = 500; if (onOpen) onOpen(ws); };
+    ws.onmessage = (ev) => {
+      let msg; try { msg = JSON.parse(ev.data); } catch { return; }
+      if (msg.type === "session") {
+        // yeni bağlantıda başlangıç noktası; devam ederken seq tekrar oynatılan olaylarla ilerler
+        epoch = msg.epoch; if (!qs) seq = msg.seq;
+        return;
+      }
+      if (msg.type === "resync-required") { seq = msg.seq; onResync && onResync(); return; }
+      if (msg.seq != null) seq = msg.seq;
+      onMessage(msg);
+    };
+    ws.onclose = () => {
+      if (closed) return;
+      // erişim noktası dalgalanınca tüm tabletler aynı anda dönmesin
+      timer = setTimeout(connect, delay * (0.5 + Math.random()));
+      delay = Math.min(delay * 2, 15000);
+    };
+  };
+  connect();
+  return () => { closed = true; if (timer) clearTimeout(timer); try { ws.close(); } catch {} };
+}
+
 function useWebSocketMetrics() {
   const [m, setM] = React.useState({ total:0, success:0, failed:0, queued:0, processing:0, avg_ack_ms:null });
   React.useEffect(() => {
-    const ws = new WebSocket((location.protocol === "https:" ? "wss://" : "ws://") + location.host + "/live/ws");
-    ws.onopen = () => {
-      try { ws.send(JSON.stringify({ type:"hello", user:(api?.user && (api.user.name||api.user.email))||"" })); } catch {}
-    };
-    ws.onmessage = (ev) => {
-      try { const msg = JSON.parse(ev.data); if (msg.type === "metrics") setM(msg); } catch {}
-    };
-    return () => ws.close();
+    return liveSocket((msg) => { if (msg.type === "metrics") setM(msg); }, {
+      onOpen: (ws) => {
+        try { ws.send(JSON.stringify({ type:"hello", user:(api?.user && (api.user.name||api.user.email))||"" })); } catch {}
+      },
+    });
   }, []);
   return m;
 }
@@ -186,10 +213,8 @@ function LabelWall() {
   const [cards, setCards] = React.useState([]);
   React.useEffect(() => { http.get("/labels/wall").then(setCards); }, []);
   React.useEffect(() => {
-    const ws = new WebSocket((location.protocol === "https:" ? "wss://" : "ws://") + location.host + "/live/ws");
-    ws.onmessage = (ev) => {
+    return liveSocket((msg) => {
       try {
-        const msg = JSON.parse(ev.data);
         if (msg.type === "label-created") {
           setCards((L) => [{ label: msg.label, product: null }, ...L]);
         } else if (msg.type === "label-updated") {
@@ -200,10 +225,11 @@ function LabelWall() {
             : x)));
         } else if (msg.type === "label-deleted") {
           setCards((L) => L.filter((x) => x.label.id !== msg.label_id));
+        } else if (msg.type === "import-completed") {
+          http.get("/labels/wall").then(setCards).catch(()=>{});
         }
       } catch {}
-    };
-    return () => ws.close();
+    }, { onResync: () => http.get("/labels/wall").then(setCards).catch(()=>{}) });
   }, []);
   async function onCardClick(label) {
     const ok = window.confirm(`Etiketi silmek istiyor musun?\n${label.id} (#${label.label_code})`);
@@ -279,13 +305,11 @@ function Catalog() {
   React.useEffect(() => {
     let timer = null;
     const scheduleRefresh = () => { if (timer) return; timer = setTimeout(()=>{ timer=null; refresh().catch(()=>{}); }, 250); };
-    const ws = new WebSocket((location.protocol === "https:" ? "wss://" : "ws://") + location.host + "/live/ws");
-    ws.onmessage = (ev) => {
-      let msg; try { msg = JSON.parse(ev.data); } catch { return; }
-      const RELOAD = new Set(["product-created","product-updated","product-deleted","label-created","label-updated","label-deleted","label-assigned","label-unassigned"]);
+    const close = liveSocket((msg) => {
+      const RELOAD = new Set(["product-created","product-updated","product-deleted","label-created","label-updated","label-deleted","label-assigned","label-unassigned","import-completed"]);
       if (msg?.type && RELOAD.has(msg.type)) scheduleRefresh();
-    };
-    return () => { try{ws.close();}catch{} if (timer) clearTimeout(timer); };
+    }, { onResync: scheduleRefresh });
+    return () => { close(); if (timer) clearTimeout(timer); };
   }, []);
 
   async function createProduct() {
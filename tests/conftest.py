@@ -0,0 +1,93 @@
+"""Ortak test düzeni.
+
+app modülleri ayarları import anında okur; bu yüzden ortam burada, app
+import edilmeden önce hazırlanır. Tüm testler tek bir event loop'ta koşar
+(engine bağlantıları loop'a bağlıdır); her test boş bir veritabanıyla başlar.
+"""
+from __future__ import annotations
+import asyncio, os, sys, tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_DB_DIR = tempfile.mkdtemp(prefix="esl-test-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["LIVE_DEBUG_DB"] = "1"
+os.environ.setdefault("LABEL_HEALTH_FLUSH", "0.1")
+os.environ.setdefault("ESL_CYCLE_TIME", "0")
+
+_loop = asyncio.new_event_loop()
+
+
+def run(coro):
+    return _loop.run_until_complete(coro)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # arka plan task'larını (WS göndericileri, zamanlayıcı) kapatıp loop'u temizle
+    pending = [t for t in asyncio.all_tasks(_loop) if not t.done()]
+    for t in pending:
+        t.cancel()
+    if pending:
+        _loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    _loop.close()
+
+
+@pytest.fixture
+def db():
+    """Şemayı sıfırlar, süreç içi tekilleri temizler ve session fabrikasını döner."""
+    from app import models
+    from app.database import engine, init_db, SessionLocal
+    from app.services.fanout import fanout_index
+    from app.services.scheduler import price_scheduler
+    from app.services.wall_cache import wall_cache
+    from app.services.simulator import price_simulator
+
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.drop_all)
+        await init_db()
+
+    run(reset())
+    fanout_index.__init__()
+    price_scheduler.__init__()
+    wall_cache.invalidate()
+    price_simulator.invalidate()
+    return SessionLocal
+
+
+@pytest.fixture
+def api(db):
+    """Uygulamaya süreç içinde istek atan eşzamanlı yardımcı: api("GET", "/labels/")."""
+    import httpx
+    from app import main
+
+    async def call(method: str, url: str, **kw) -> httpx.Response:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kw)
+
+    return lambda method, url, **kw: run(call(method, url, **kw))
+
+
+async def seed(SessionLocal, products=(), labels=(), assignments=(), requests=()):
+    """Ürün / etiket / atama / fiyat talebi satırlarını doğrudan (API'yi atlayarak) ekler."""
+    from sqlalchemy import insert
+    from app import models
+    async with SessionLocal() as session:
+        for model, rows in ((models.Product, products), (models.ShelfLabel, labels),
+                            (models.LabelAssignment, assignments), (models.PriceChangeRequest, requests)):
+            if rows:
+                await session.execute(insert(model), list(rows))
+        await session.commit()
+
+
+def product(pid: str, price: float = 10) -> dict:
+    return {"id": pid, "sku": pid, "name": pid, "base_price": price, "currency": "TRY"}
+
+
+def label(lid: str, store: str) -> dict:
+    return {"id": lid, "label_code": lid, "store": store}
+
+
+def price_request(rid: str, product_id: str, store: str, new_price: float = 12, status: str = "APPROVED", **kw) -> dict:
+    return {"id": rid, "product_id": product_id, "store": store, "new_price": new_price, "status": status, **kw}
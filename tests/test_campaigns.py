@@ -0,0 +1,31 @@
+from __future__ import annotations
+from conftest import label, product, run, seed
+
+
+def _campaign(api, **kw):
+    body = {"id": "C1", "name": "c", "stores": ["S1", "S2"], "product_ids": ["P1"], "percent": -10, **kw}
+    return api("POST", "/campaigns/", json=body)
+
+
+def test_only_pending_campaigns_can_be_decided(db, api):
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}]))
+    assert _campaign(api, approver="m", start=True).status_code == 200
+    r = api("POST", "/campaigns/C1/approve", json={"approver": "m", "decision": "REJECT"})
+    assert r.status_code == 400
+    assert api("GET", "/campaigns/C1").json()["status"] == "STARTED"
+
+
+def test_requests_without_labels_are_reported_and_closed(db, api):
+    # S2'de etiket yok
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}]))
+    assert _campaign(api).status_code == 200
+    assert api("POST", "/campaigns/C1/approve", json={"approver": "m", "decision": "APPROVE"}).status_code == 200
+    r = api("POST", "/campaigns/C1/start")
+    assert r.status_code == 200, r.text
+    assert r.json()["jobs"] == 1
+    assert r.json()["no_labels"] == ["C1-P1-S2"]
+    progress = api("GET", "/campaigns/C1").json()
+    assert progress["requests"] == {"total": 2, "APPROVED": 1, "NO_LABELS": 1}
+    # ikinci start iş açmaz, 500 de vermez
+    r = api("POST", "/campaigns/C1/start")
+    assert r.status_code == 400
@@ -0,0 +1,55 @@
+from __future__ import annotations
+from sqlalchemy import delete, update
+from app import models
+from app.services.fanout import fanout_index
+from app.services.push_jobs import expand_requests
+from conftest import label, price_request, product, run, seed
+
+
+def _expand(db, rid):
+    async def go():
+        async with db() as session:
+            req = await session.get(models.PriceChangeRequest, rid)
+            counts = await expand_requests(session, [req])
+            await session.rollback()
+            return counts
+    return run(go())
+
+
+def test_index_sees_writes_from_outside_the_process(db):
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}]))
+    run(fanout_index.start(db))
+    assert fanout_index.labels("S1", "P1") == ["L1"]
+
+    # başka süreç / doğrudan DB yazımı: yerel yollar indeksi güncellemez
+    run(seed(db, [product("P2")], [label("L2", "S1")], [{"label_id": "L2", "product_id": "P2"}]))
+    assert run(fanout_index.sync())
+    assert fanout_index.labels("S1", "P2") == ["L2"]
+
+    async def move_and_delete():
+        async with db() as session:
+            await session.execute(update(models.ShelfLabel).where(models.ShelfLabel.id == "L2").values(store="S2"))
+            await session.execute(delete(models.LabelAssignment).where(models.LabelAssignment.label_id == "L1"))
+            await session.commit()
+    run(move_and_delete())
+    assert run(fanout_index.sync())
+    assert fanout_index.labels("S1", "P2") == []
+    assert fanout_index.labels("S2", "P2") == ["L2"]
+    assert fanout_index.labels("S1", "P1") == []
+
+
+def test_expand_requests_uses_labels_written_after_startup(db):
+    run(fanout_index.start(db))
+    run(seed(db, [product("P1")], [label("L1", "S1"), label("L2", "S1")],
+             [{"label_id": "L1", "product_id": "P1"}, {"label_id": "L2", "product_id": "P1"}],
+             [price_request("R1", "P1", "S1")]))
+    assert _expand(db, "R1") == {"R1": 2}
+
+
+def test_expand_requests_falls_back_to_db_when_index_is_empty(db):
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}],
+             [price_request("R1", "P1", "S1")]))
+    run(fanout_index.start(db))
+    # indeks yetkili sanıyor ama bu anahtarı bilmiyor: DB sorgusu yine bulmalı
+    fanout_index.label_deleted("L1")
+    assert _expand(db, "R1") == {"R1": 1}
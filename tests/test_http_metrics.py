@@ -0,0 +1,14 @@
+from __future__ import annotations
+import logging
+from app.services import sql_profile
+from conftest import product, run, seed
+
+
+def test_slow_request_log_uses_route_template(db, api, monkeypatch, caplog):
+    monkeypatch.setattr(sql_profile, "SQL_PROFILE", True)
+    monkeypatch.setattr(sql_profile, "SQL_SLOW_MS", 0)
+    run(seed(db, [product("P1")]))
+    with caplog.at_level(logging.WARNING, logger="esl.sql"):
+        assert api("GET", "/products/P1/price-history").status_code == 200
+    assert "GET /products/{product_id}/price-history" in caplog.text
+    assert "/products/P1/" not in caplog.text
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import json
+from app.services.fanout import fanout_index
+from conftest import label, product, run, seed
+
+
+def _upload(api, kind, name, text, **params):
+    r = api("POST", f"/import/{kind}", params=params, files={"file": (name, text.encode())})
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_csv_products_reject_duplicates_and_bad_rows(db, api):
+    run(seed(db, [product("P0")]))
+    text = ("\ufeffid,sku,name,base_price\r\n"
+            "P1,SKU-1,Çay,12.50\r\n"
+            "\r\n"
+            "P2,P0,Kahve,20\r\n"       # SKU zaten var
+            "P3,SKU-3,Su,abc\r\n"      # geçersiz fiyat
+            "P4,SKU-4\r\n"             # eksik sütun
+            "P1,SKU-5,Süt,3\r\n"       # aynı dosyada tekrar eden id
+            "P6,SKU-6,Süt,3\r\n")
+    body = _upload(api, "products", "products.csv", text)
+    assert body["format"] == "csv" and body["inserted"] == 2 and body["skipped"] == 4
+    assert [e["line"] for e in body["errors"]] == [4, 5, 6, 7]
+    assert body["errors"][0]["error"] == "SKU exists: P0"
+    ids = sorted(p["id"] for p in api("GET", "/products/").json())
+    assert ids == ["P0", "P1", "P6"]
+
+
+def test_ndjson_labels_and_assignments_update_fanout_and_wall(db, api):
+    run(seed(db, [product("P1")], [label("L0", "S1")]))
+    run(fanout_index.start(db))
+    etag = api("GET", "/labels/wall").headers["ETag"]
+
+    labels = "\n".join([json.dumps(label("L1", "S1")), "{not json", json.dumps(label("L0", "S2")),
+                        json.dumps([1, 2])])
+    body = _upload(api, "labels", "labels.ndjson", labels)
+    assert body["format"] == "ndjson" and body["inserted"] == 1
+    assert [e["line"] for e in body["errors"]] == [2, 3, 4]
+
+    rows = [{"label_id": "L1", "product_id": "P1"}, {"label_id": "L1", "product_id": "P1"},
+            {"label_id": "LX", "product_id": "P1"}, {"label_id": "L0", "product_id": "PX"}]
+    body = _upload(api, "assignments", "a.jsonl", "\n".join(map(json.dumps, rows)))
+    assert body["inserted"] == 1 and body["skipped"] == 3
+    assert [e["error"] for e in body["errors"]] == ["label not found: LX", "product not found: PX"]
+
+    assert fanout_index.labels("S1", "P1") == ["L1"]
+    r = api("GET", "/labels/wall", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    cards = {c["label"]["id"]: c for c in r.json()}
+    assert cards["L1"]["product"]["id"] == "P1" and cards["L0"]["product"] is None
@@ -0,0 +1,67 @@
+from __future__ import annotations
+from sqlalchemy import delete, update
+from app import models
+from conftest import label, product, run, seed
+
+
+def _drain(api, since, limit):
+    """/live/changes'i more=False olana dek sayfalar; (upserts, deletes, version) döner."""
+    upserts, deletes = [], []
+    while True:
+        r = api("GET", "/live/changes", params={"since": since, "limit": limit})
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert not body["resync_required"]
+        upserts += body["upserts"]
+        deletes += body["deletes"]
+        assert body["version"] >= since
+        since = body["version"]
+        if not body["more"]:
+            return upserts, deletes, since
+
+
+def test_paging_delivers_every_change_once(db, api):
+    start = api("GET", "/live/db-snapshot").json()["version"]
+    run(seed(db, [product("P1")], [label(f"x-{i}", "S1") for i in range(5)]))
+    upserts, deletes, version = _drain(api, start, limit=2)
+    labels = [u["row"]["id"] for u in upserts if u["table"] == "labels"]
+    assert labels == [f"x-{i}" for i in range(5)]
+    assert [u["row"]["id"] for u in upserts if u["table"] == "products"] == ["P1"]
+    assert deletes == []
+    # sürüm dönen satırlarla tutarlı ve artık yeni bir şey yok
+    assert version == max(u["row"]["_v"] for u in upserts)
+    assert _drain(api, version, limit=2)[:2] == ([], [])
+
+
+def test_updates_and_deletes_are_reported_in_version_order(db, api):
+    run(seed(db, [product("P1")], [label("L1", "S1"), label("L2", "S1")],
+             [{"label_id": "L1", "product_id": "P1"}]))
+    since = api("GET", "/live/db-snapshot").json()["version"]
+
+    async def mutate():
+        async with db() as session:
+            await session.execute(update(models.ShelfLabel).where(models.ShelfLabel.id == "L2").values(battery_pct=5))
+            await session.execute(delete(models.LabelAssignment))
+            await session.commit()
+    run(mutate())
+    upserts, deletes, _ = _drain(api, since, limit=1)
+    assert [(u["table"], u["row"]["id"], u["row"]["battery_pct"]) for u in upserts] == [("labels", "L2", 5)]
+    assert [(d["table"], d["key"]) for d in deletes] == [("assignments", {"label_id": "L1", "product_id": "P1"})]
+
+
+def test_client_behind_pruned_tombstones_must_resync(db, api):
+    run(seed(db, labels=[label("L1", "S1")]))
+
+    async def prune_all():
+        from app.database import engine
+        from app.services import change_log
+        async with db() as session:
+            await session.execute(delete(models.ShelfLabel))
+            await session.commit()
+        async with engine.begin() as conn:
+            await change_log.prune(conn, days=-1)
+    run(prune_all())
+    r = api("GET", "/live/changes", params={"since": 1})
+    assert r.json()["resync_required"] is True
+    # boş istemci (since=0) için budanmış silmeler önemsiz
+    assert api("GET", "/live/changes", params={"since": 0}).json()["resync_required"] is False
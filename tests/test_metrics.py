@@ -0,0 +1,26 @@
+from __future__ import annotations
+from app.services.metrics import PushMetrics
+from test_push_runner import _setup
+from conftest import run
+
+
+def test_reseed_keeps_moves_made_while_counting(db):
+    _setup(db)  # 2 QUEUED iş
+    m = PushMetrics()
+
+    class Session:
+        # sayım sürerken bu süreçte bir iş QUEUED -> PROCESSING geçti
+        def __init__(self, session):
+            self.session = session
+
+        async def execute(self, stmt):
+            rows = await self.session.execute(stmt)
+            m.moved("QUEUED", "PROCESSING")
+            return rows
+
+    async def go():
+        async with db() as session:
+            await m.seed(session)
+            await m.seed(Session(session))
+    run(go())
+    assert m.counts["QUEUED"] == 1 and m.counts["PROCESSING"] == 1
@@ -0,0 +1,21 @@
+from __future__ import annotations
+from conftest import label, run, seed
+
+
+def test_label_list_pages_by_cursor(db, api):
+    run(seed(db, labels=[label(f"L{i}", "S1") for i in range(5)]))
+    r = api("GET", "/labels/?limit=2")
+    assert r.status_code == 200, r.text
+    assert [l["id"] for l in r.json()] == ["L0", "L1"]
+    seen = [l["id"] for l in r.json()]
+    while "X-Next-Cursor" in r.headers:
+        r = api("GET", "/labels/", params={"limit": 2, "cursor": r.headers["X-Next-Cursor"]})
+        seen += [l["id"] for l in r.json()]
+    assert seen == [f"L{i}" for i in range(5)]
+
+
+def test_label_list_without_limit_returns_everything(db, api):
+    run(seed(db, labels=[label(f"L{i}", "S1") for i in range(3)]))
+    r = api("GET", "/labels/")
+    assert r.status_code == 200 and len(r.json()) == 3
+    assert "X-Next-Cursor" not in r.headers
@@ -0,0 +1,50 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import insert, select
+from app import models
+from app.services import price_rollup
+from conftest import product, run, seed
+
+DAY = datetime(2026, 3, 2)
+# (saat, eski, yeni); son kayıt geç gelir ve günün ilk değişikliğidir
+CHANGES = [(10, 10, 12), (12, 12, 15), (9, 9, 10)]
+
+
+def _rollup(db):
+    async def go():
+        async with db() as session:
+            return (await session.execute(select(models.PriceDailyRollup))).scalars().all()
+    rows = run(go())
+    return [(r.product_id, r.store, r.day, r.open_price, r.close_price, r.min_price, r.max_price,
+             r.changes, r.first_at.hour, r.last_at.hour) for r in rows]
+
+
+EXPECTED = [("P1", "S1", DAY.date(), 9, 15, 9, 15, 3, 9, 12)]
+
+
+def test_record_change_orders_late_rows_by_time(db):
+    run(seed(db, [product("P1")]))
+
+    async def go():
+        async with db() as session:
+            for hour, old, new in CHANGES:
+                await price_rollup.record_change(session, "P1", "S1", old, new, DAY.replace(hour=hour))
+            await session.commit()
+    run(go())
+    assert _rollup(db) == EXPECTED
+
+
+def test_rebuild_backfills_from_history(db):
+    from app.database import engine
+    run(seed(db, [product("P1")]))
+
+    async def go():
+        async with db() as session:
+            await session.execute(insert(models.PriceHistory), [
+                {"product_id": "P1", "store": "S1", "old_price": old, "new_price": new,
+                 "changed_at": DAY.replace(hour=hour)} for hour, old, new in CHANGES])
+            await session.commit()
+        async with engine.begin() as conn:
+            await price_rollup.rebuild(conn)
+    run(go())
+    assert _rollup(db) == EXPECTED
@@ -0,0 +1,140 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from app import models
+from app.services.emulator import EmulatorService
+from app.services.push_jobs import expand_requests
+from app.services.push_runner import PushRunner
+from conftest import label, price_request, product, run, seed
+
+
+def _setup(db, n_labels=2):
+    labels = [label(f"L{i}", "S1") for i in range(n_labels)]
+    run(seed(db, [product("P1")], labels, [{"label_id": l["id"], "product_id": "P1"} for l in labels],
+             [price_request("R1", "P1", "S1")]))
+
+    async def expand():
+        async with db() as session:
+            await expand_requests(session, [await session.get(models.PriceChangeRequest, "R1")])
+            await session.commit()
+    run(expand())
+
+
+async def _all_jobs(db):
+    async with db() as session:
+        return list((await session.execute(select(models.PushJob))).scalars())
+
+
+def _jobs(db):
+    return {j.id: j for j in run(_all_jobs(db))}
+
+
+def _runner(db, worker_id):
+    return PushRunner(db, EmulatorService(success_rate=1.0), workers=1, worker_id=worker_id)
+
+
+def _claim(db, runner):
+    async def go():
+        async with db() as session:
+            return [j.id for j in await runner._claim(session)]
+    return run(go())
+
+
+def test_claim_writes_lease_and_excludes_other_workers(db):
+    _setup(db)
+    a, b = _runner(db, "A"), _runner(db, "B")
+    assert len(_claim(db, a)) == 2
+    assert _claim(db, b) == []
+    for j in _jobs(db).values():
+        assert j.status == "PROCESSING" and j.lease_owner == "A"
+        assert j.lease_expires_at > datetime.utcnow()
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_is_fenced_off(db):
+    _setup(db)
+    a, b = _runner(db, "A"), _runner(db, "B")
+
+    async def claim_and_expire():
+        async with db() as session:
+            jobs = await a._claim(session)
+            # A takıldı: kirası doldu
+            await session.execute(update(models.PushJob).values(
+                lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            await session.commit()
+            return jobs
+    # A'nın session'ı ve iş nesneleri süreç içinde kalır; sonuç yazımını sonra dener
+    async def late_process():
+        async with db() as session:
+            jobs = list((await session.execute(select(models.PushJob))).scalars())
+            await a._process(session, jobs)
+
+    assert len(run(claim_and_expire())) == 2
+    assert len(_claim(db, b)) == 2
+    run(late_process())
+    for j in _jobs(db).values():
+        # A'nın gecikmiş sonucu yazılmadı; iş B'de
+        assert j.status == "PROCESSING" and j.lease_owner == "B"
+
+
+def test_owner_writes_results_and_releases_lease(db):
+    _setup(db)
+    a = _runner(db, "A")
+
+    async def claim_and_process():
+        async with db() as session:
+            jobs = await a._claim(session)
+            await a._process(session, jobs)
+    run(claim_and_process())
+    for j in _jobs(db).values():
+        assert j.status == "SUCCESS" and j.lease_owner is None
+
+
+def test_worker_survives_a_failing_iteration(db, monkeypatch):
+    import asyncio
+    from app.services import push_runner
+    monkeypatch.setattr(push_runner, "PUSH_ERROR_BACKOFF", 0)
+    _setup(db)
+    a = _runner(db, "A")
+    claim, calls = a._claim, []
+
+    async def flaky(session):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return await claim(session)
+    a._claim = flaky
+
+    async def go():
+        task = asyncio.create_task(a._run(0))
+        for _ in range(50):
+            await asyncio.sleep(0.05)
+            if all(j.status == "SUCCESS" for j in (await _all_jobs(db))):
+                break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    run(go())
+    assert len(calls) > 1
+    assert all(j.status == "SUCCESS" for j in _jobs(db).values())
+
+
+def test_only_the_bus_hub_broadcasts_metrics(db, monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+    from app.services import push_runner
+    sent = []
+    a = _runner(db, "A")
+
+    async def broadcast():
+        sent.append(1)
+    a._broadcast_metrics = broadcast
+
+    async def tick(is_hub):
+        monkeypatch.setattr(push_runner, "event_bus", SimpleNamespace(shared=True, is_hub=is_hub))
+        task = asyncio.create_task(a._metrics_loop())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    run(tick(False))
+    assert sent == []
+    run(tick(True))
+    assert sent == [1]
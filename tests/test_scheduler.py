@@ -0,0 +1,117 @@
+from __future__ import annotations
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from app import models
+from app.services import scheduler as scheduler_mod
+from app.services.scheduler import PriceScheduler, price_scheduler
+from conftest import label, price_request, product, run, seed
+
+
+@pytest.fixture
+def scheduler(db, monkeypatch):
+    monkeypatch.setattr(scheduler_mod, "SCHEDULE_POLL", 0.1)
+    run(price_scheduler.start(db))
+    yield price_scheduler
+    price_scheduler._task.cancel()
+    run(asyncio.sleep(0))
+
+
+def _request(db, rid):
+    async def go():
+        async with db() as session:
+            return await session.get(models.PriceChangeRequest, rid)
+    return run(go())
+
+
+def _settle(seconds: float = 0.5):
+    run(asyncio.sleep(seconds))
+
+
+def test_campaign_approved_inside_lead_window_is_expanded(db, api, scheduler):
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}]))
+    at = datetime.utcnow() + timedelta(seconds=3)
+    r = api("POST", "/campaigns/", json={"id": "C1", "name": "c", "stores": ["S1"], "product_ids": ["P1"],
+                                          "percent": -10, "scheduled_at": at.isoformat(), "approver": "m"})
+    assert r.status_code == 200, r.text
+    _settle()
+    req = _request(db, "C1-P1-S1")
+    assert req.status == "APPROVED" and req.jobs_total == 1
+
+
+def test_requests_approved_elsewhere_are_picked_up_by_polling(db, scheduler):
+    # başka süreçte onaylanmış; bu sürecin track()'i hiç çağrılmadı
+    at = datetime.utcnow() + timedelta(seconds=1)
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}],
+             [price_request("R1", "P1", "S1", scheduled_at=at)]))
+    _settle()
+    assert _request(db, "R1").jobs_total == 1
+
+
+def test_request_without_labels_is_closed(db, scheduler):
+    run(seed(db, [product("P1")], requests=[price_request("R1", "P1", "S1", scheduled_at=datetime.utcnow())]))
+    price_scheduler.track([("R1", datetime.utcnow())])
+    _settle()
+    assert _request(db, "R1").status == "NO_LABELS"
+
+
+def test_manual_start_after_scheduler_expansion_conflicts(db, api, scheduler):
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}],
+             [price_request("R1", "P1", "S1", scheduled_at=datetime.utcnow())]))
+    price_scheduler.track([("R1", datetime.utcnow())])
+    _settle()
+    assert _request(db, "R1").jobs_total == 1
+    r = api("POST", "/push/R1/start")
+    assert r.status_code == 409, r.text
+
+
+def test_campaign_start_skips_requests_already_expanded(db, api, scheduler):
+    run(seed(db, [product("P1"), product("P2")], [label("L1", "S1"), label("L2", "S1")],
+             [{"label_id": "L1", "product_id": "P1"}, {"label_id": "L2", "product_id": "P2"}]))
+    at = datetime.utcnow() + timedelta(hours=1)
+    r = api("POST", "/campaigns/", json={"id": "C1", "name": "c", "stores": ["S1"], "product_ids": ["P1", "P2"],
+                                          "new_price": 5, "scheduled_at": at.isoformat(), "approver": "m"})
+    assert r.status_code == 200, r.text
+    # biri zamanlayıcı tarafından açılmış
+    run(price_scheduler._expand(["C1-P1-S1"]))
+    assert _request(db, "C1-P1-S1").jobs_total == 1
+    r = api("POST", "/campaigns/C1/start")
+    assert r.status_code == 200, r.text
+    assert r.json()["jobs"] == 1
+
+
+def test_scheduler_without_runner_only_forwards(db):
+    web = PriceScheduler()  # PUSH_RUNNER=0 süreci: start() çağrılmadı
+    web.track([("R1", datetime.utcnow())])
+    assert web.upcoming == 0
+
+    worker = PriceScheduler()
+    worker.session_factory = db
+    worker.on_remote_event("_schedule", '[["R1", "%s"]]' % datetime.utcnow().isoformat())
+    assert worker.upcoming == 1
+
+
+def test_loop_prunes_old_tombstones(db, monkeypatch):
+    from sqlalchemy import delete, select, update
+    monkeypatch.setattr(scheduler_mod, "CHANGES_PRUNE_EVERY", 0.05)
+    run(seed(db, labels=[label("L1", "S1")]))
+
+    async def delete_long_ago():
+        async with db() as session:
+            await session.execute(delete(models.ShelfLabel))
+            await session.execute(update(models.ChangeTombstone).values(
+                deleted_at=datetime.utcnow() - timedelta(days=30)))
+            await session.commit()
+    run(delete_long_ago())
+
+    run(price_scheduler.start(db))
+    run(asyncio.sleep(0.3))
+    price_scheduler._task.cancel()
+    run(asyncio.sleep(0))
+
+    async def state():
+        async with db() as session:
+            left = (await session.execute(select(models.ChangeTombstone))).scalars().all()
+            return left, await session.get(models.ChangeSeq, 1)
+    left, seq = run(state())
+    assert left == [] and seq.floor > 0
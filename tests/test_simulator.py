@@ -0,0 +1,47 @@
+from __future__ import annotations
+from sqlalchemy import delete, insert, update
+from app import models
+from conftest import label, product, run, seed
+
+
+def _labels_hit(api, store):
+    r = api("POST", "/simulate/", json={"percent": 10, "stores": [store]})
+    assert r.status_code == 200, r.text
+    return r.json()["labels"]
+
+
+def _write(db, *stmts):
+    async def go():
+        async with db() as session:
+            for stmt in stmts:
+                await session.execute(stmt)
+            await session.commit()
+    run(go())
+
+
+def test_cached_arrays_follow_assignment_swaps_and_store_moves(db, api):
+    run(seed(db, [product("P1")], [label("L1", "S1"), label("L2", "S2")],
+             [{"label_id": "L1", "product_id": "P1"}]))
+    assert _labels_hit(api, "S1") == 1
+
+    # sayılar aynı kalır: bir atama silinir, başka mağazada biri eklenir
+    _write(db, delete(models.LabelAssignment).where(models.LabelAssignment.label_id == "L1"),
+           insert(models.LabelAssignment).values(label_id="L2", product_id="P1"))
+    assert _labels_hit(api, "S1") == 0
+    assert _labels_hit(api, "S2") == 1
+
+    # etiketin mağazası değişti (updated_at yok)
+    _write(db, update(models.ShelfLabel).where(models.ShelfLabel.id == "L2").values(store="S1"))
+    assert _labels_hit(api, "S1") == 1
+    assert _labels_hit(api, "S2") == 0
+
+
+def test_cached_arrays_survive_unrelated_writes(db, api):
+    from app.services.simulator import price_simulator
+    run(seed(db, [product("P1")], [label("L1", "S1")], [{"label_id": "L1", "product_id": "P1"}]))
+    assert _labels_hit(api, "S1") == 1
+    arrays = price_simulator._arrays
+    # etiket telemetrisi diziyi geçersiz kılmaz
+    _write(db, update(models.ShelfLabel).values(battery_pct=50))
+    assert _labels_hit(api, "S1") == 1
+    assert price_simulator._arrays is arrays
@@ -0,0 +1,106 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app import models
+from app.services.push_jobs import supersede_older
+from conftest import price_request, product, run, seed
+from test_push_runner import _claim, _jobs, _runner, _setup
+
+NOW = datetime.utcnow()
+
+
+def _status(db, rid):
+    async def go():
+        async with db() as session:
+            return (await session.get(models.PriceChangeRequest, rid)).status
+    return run(go())
+
+
+def test_adhoc_change_does_not_supersede_later_scheduled_price(db):
+    run(seed(db, [product("P1")], requests=[
+        price_request("R0", "P1", "S1", created_at=NOW - timedelta(days=2)),
+        # eski tarihte onaylanmış, yarına zamanlanmış kampanya fiyatı
+        price_request("RS", "P1", "S1", created_at=NOW - timedelta(days=3),
+                      scheduled_at=NOW + timedelta(days=1)),
+        price_request("RI", "P1", "S1", created_at=NOW),
+    ]))
+
+    async def go():
+        async with db() as session:
+            await supersede_older(session, [await session.get(models.PriceChangeRequest, "RI")])
+            await session.commit()
+    run(go())
+    assert _status(db, "R0") == "SUPERSEDED"
+    assert _status(db, "RS") == "APPROVED"
+    assert _status(db, "RI") == "APPROVED"
+
+
+def test_runner_keeps_due_scheduled_price_over_earlier_effective_completed(db):
+    run(seed(db, [product("P1")], requests=[
+        price_request("RS", "P1", "S1", created_at=NOW - timedelta(days=3),
+                      scheduled_at=NOW - timedelta(minutes=1)),
+        # RS'den sonra oluşturuldu ama ondan önce yürürlüğe girdi
+        price_request("RC", "P1", "S1", status="COMPLETED", created_at=NOW - timedelta(days=1)),
+        price_request("R0", "P1", "S1", created_at=NOW - timedelta(days=2)),
+    ]))
+
+    async def go():
+        async with db() as session:
+            reqs = [await session.get(models.PriceChangeRequest, rid) for rid in ("RS", "R0")]
+            return await _runner(db, "A")._superseded(session, reqs)
+    assert run(go()) == {"R0"}
+
+
+def _get(db, model, key):
+    async def go():
+        async with db() as session:
+            return await session.get(model, key)
+    return run(go())
+
+
+def test_supersede_older_cancels_queued_jobs_and_counts_them(db):
+    _setup(db)  # R1: iki etikete QUEUED iş
+    run(seed(db, requests=[price_request("R2", "P1", "S1", new_price=13)]))
+
+    async def go():
+        async with db() as session:
+            n = await supersede_older(session, [await session.get(models.PriceChangeRequest, "R2")])
+            await session.commit()
+            return n
+    assert run(go()) == 2
+    r1 = _get(db, models.PriceChangeRequest, "R1")
+    assert r1.status == "SUPERSEDED" and r1.jobs_cancelled == 2
+    assert {j.status for j in _jobs(db).values()} == {"CANCELLED"}
+    assert _status(db, "R2") == "APPROVED"
+
+
+def test_runner_cancels_claimed_jobs_of_superseded_request(db):
+    _setup(db)
+    a = _runner(db, "A")
+    assert len(_claim(db, a)) == 2
+    # iş sahiplenildikten sonra daha yeni fiyat onaylandı
+    run(seed(db, requests=[price_request("R2", "P1", "S1", new_price=13)]))
+
+    async def go():
+        async with db() as session:
+            jobs = list((await session.execute(select(models.PushJob))).scalars())
+            await a._process(session, jobs)
+    run(go())
+    assert _status(db, "R1") == "SUPERSEDED"
+    for j in _jobs(db).values():
+        assert j.status == "CANCELLED" and j.last_error == "superseded"
+    assert _get(db, models.PriceChangeRequest, "R1").jobs_cancelled == 2
+    assert _get(db, models.Product, "P1").base_price == 10
+
+
+def test_complete_request_does_not_apply_superseded_price(db):
+    run(seed(db, [product("P1")], requests=[price_request("R1", "P1", "S1", status="SUPERSEDED")]))
+
+    async def go():
+        async with db() as session:
+            req = await session.get(models.PriceChangeRequest, "R1")
+            await _runner(db, "A")._complete_request(session, req, await session.get(models.Product, "P1"))
+            return (await session.execute(select(models.PriceHistory))).scalars().all()
+    assert run(go()) == []
+    assert _status(db, "R1") == "SUPERSEDED"
+    assert _get(db, models.Product, "P1").base_price == 10
@@ -0,0 +1,51 @@
+from __future__ import annotations
+from conftest import label, product, run, seed
+
+
+def test_wall_answers_304_until_a_mutation(db, api):
+    run(seed(db, [product("P1")], [label("L1", "S1")]))
+    r = api("GET", "/labels/wall")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert [c["label"]["id"] for c in r.json()] == ["L1"]
+
+    assert api("GET", "/labels/wall", headers={"If-None-Match": etag}).status_code == 304
+
+    assert api("POST", "/labels/", json={"id": "L2", "label_code": "L2", "store": "S1"}).status_code == 200
+    r = api("GET", "/labels/wall", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+    assert sorted(c["label"]["id"] for c in r.json()) == ["L1", "L2"]
+
+    etag = r.headers["ETag"]
+    assert api("POST", "/labels/assign", json={"label_id": "L1", "product_id": "P1"}).status_code == 200
+    r = api("GET", "/labels/wall", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    cards = {c["label"]["id"]: c for c in r.json()}
+    assert cards["L1"]["product"]["id"] == "P1" and cards["L2"]["product"] is None
+
+
+def test_etag_differs_per_query(db, api):
+    run(seed(db, labels=[label("L1", "S1")]))
+    full = api("GET", "/labels/wall").headers["ETag"]
+    filtered = api("GET", "/labels/wall", params={"store": "S1"})
+    assert filtered.status_code == 200 and filtered.headers["ETag"] != full
+    assert api("GET", "/labels/wall", params={"store": "S1"},
+               headers={"If-None-Match": full}).status_code == 200
+
+
+def test_updated_since_is_not_cached_across_telemetry_flush(db, api):
+    from datetime import datetime, timedelta
+    from app.services.label_health import label_health
+    now = datetime.utcnow()
+    run(seed(db, labels=[{**label("L1", "S1"), "last_seen": now - timedelta(hours=1)}]))
+    since = {"updated_since": (now - timedelta(minutes=1)).isoformat()}
+    r = api("GET", "/labels/wall", params=since)
+    assert r.status_code == 200 and r.json() == [] and "ETag" not in r.headers
+
+    # başarılı ACK: last_seen ilerler, batarya (ve önbellek sürümü) değişmez
+    label_health.session_factory = db
+    label_health.record("L1", True)
+    run(label_health.flush())
+    etag = api("GET", "/labels/wall").headers["ETag"]
+    r = api("GET", "/labels/wall", params=since, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and [c["label"]["id"] for c in r.json()] == ["L1"]
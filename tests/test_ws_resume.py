@@ -0,0 +1,75 @@
+from __future__ import annotations
+import asyncio, json
+from app.routers.live import WSManager
+from conftest import run
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def _connect(manager, epoch=None, since=None):
+    ws = FakeWS()
+    run(manager.connect(ws, epoch, since))
+    return ws
+
+
+def _broadcast(manager, *messages):
+    async def go():
+        for m in messages:
+            await manager.broadcast_json(m)
+        await asyncio.sleep(0)
+    run(go())
+
+
+def _flush():
+    run(asyncio.sleep(0.01))
+
+
+def test_events_carry_sequence_numbers_and_resume_replays_the_gap():
+    m = WSManager()
+    first = _connect(m)
+    _broadcast(m, {"type": "label-created", "n": 1}, {"type": "metrics"}, {"type": "label-deleted", "n": 2})
+    _flush()
+    session, *events = first.sent
+    assert session["type"] == "session"
+    assert [e.get("seq") for e in events] == [1, None, 2]  # metrics sırasız
+
+    m.disconnect(first)
+    _broadcast(m, {"type": "label-created", "n": 3}, {"type": "label-created", "n": 4})
+    again = _connect(m, session["epoch"], 2)
+    _broadcast(m, {"type": "label-created", "n": 5})
+    _flush()
+    assert again.sent[0]["type"] == "session"
+    assert [e["n"] for e in again.sent[1:]] == [3, 4, 5]
+    assert [e["seq"] for e in again.sent[1:]] == [3, 4, 5]
+
+
+def test_resume_requires_resync_when_epoch_changes_or_ring_is_exceeded():
+    m = WSManager(replay_size=2)
+    ws = _connect(m, "other-process", 0)
+    _flush()
+    assert [e["type"] for e in ws.sent] == ["session", "resync-required"]
+
+    _broadcast(m, *({"type": "label-created", "n": i} for i in range(5)))
+    ws = _connect(m, m.epoch, 1)  # 2..3 halkadan düştü
+    _flush()
+    assert [e["type"] for e in ws.sent] == ["session", "resync-required"]
+
+    ws = _connect(m, m.epoch, 3)
+    _flush()
+    assert [e["seq"] for e in ws.sent[1:]] == [4, 5]
+
+    ws = _connect(m, m.epoch, 5)  # güncel: tekrar oynatılacak bir şey yok
+    _flush()
+    assert [e["type"] for e in ws.sent] == ["session"]